@@ -2,14 +2,74 @@ import streamlit as st
 import numpy as np
 from src.utils.black_scholes import calculate_black_scholes
 from src.utils.advanced_models import heston_model, sabr_model
-from src.utils.visualization import create_interactive_heatmap, create_draggable_pnl_chart
+from src.utils.american_options import lattice_price, lsm_heston
 from src.utils.greeks import calculate_greeks
-from src.utils.risk_metrics import calculate_var, calculate_expected_shortfall
-from src.utils.historical_data import fetch_historical_data
+from src.utils.finite_difference import finite_difference_greeks
+from src.utils.risk_metrics import historical_option_risk, simulate_option_risk
+from src.utils.cache import memoize, cache_stats, clear_caches
 from src.components.tooltips import add_tooltips
 import datetime
 assert isinstance(datetime.date(2020, 1, 1), datetime.date)
 
+# Model calls cached on their inputs, so reruns only recompute what a widget change affects
+cached_black_scholes = memoize(name="black_scholes")(calculate_black_scholes)
+cached_heston_model = memoize(name="heston_model")(heston_model)
+cached_sabr_model = memoize(name="sabr_model")(sabr_model)
+cached_lattice_price = memoize(name="lattice_price")(lattice_price)
+cached_lsm_heston = memoize(name="lsm_heston")(lsm_heston)
+cached_greeks = memoize(name="greeks")(calculate_greeks)
+cached_fd_greeks = memoize(name="fd_greeks")(finite_difference_greeks)
+cached_option_risk = memoize(name="option_risk")(simulate_option_risk)
+cached_historical_risk = memoize(name="historical_risk")(historical_option_risk)
+
+
+# Sampling methods offered for the Monte Carlo engines
+VARIANCE_REDUCTION_OPTIONS = {
+    "None": None,
+    "Antithetic Variates": 'antithetic',
+    "Moment Matching": 'moment_matching',
+    "Sobol + Brownian Bridge": 'sobol',
+}
+
+# Display names of the realized volatility estimators
+VOLATILITY_ESTIMATORS = {
+    'close_to_close': "Close-to-Close",
+    'parkinson': "Parkinson",
+    'garman_klass': "Garman-Klass",
+    'rogers_satchell': "Rogers-Satchell",
+    'yang_zhang': "Yang-Zhang",
+    'ewma': "EWMA",
+}
+
+# Risk engines offered in the Risk Metrics view
+RISK_METHODS = {
+    "Monte Carlo (GBM)": 'mc',
+    "Historical Simulation": 'historical',
+    "Filtered Historical (EWMA)": 'ewma',
+    "Filtered Historical (GARCH)": 'garch',
+}
+
+# Heatmap axis pairs offered in the Option Pricing view: (x input, y input)
+HEATMAP_AXES = {
+    "Stock Price × Volatility": ('S', 'sigma'),
+    "Stock Price × Time to Maturity": ('S', 'T'),
+    "Strike Price × Volatility": ('K', 'sigma'),
+}
+
+
+# A 1000 x 1000 heatmap holds an 8 MB grid plus its figure, so keep only a few
+@memoize(maxsize=8, name="heatmap")
+def cached_heatmap(*args):
+    # Plotly is imported on first use to keep it off the cold-start path
+    from src.utils.visualization import create_sensitivity_heatmap
+    return create_sensitivity_heatmap(*args)
+
+
+@memoize(name="vol_surface")
+def cached_vol_surface(*args):
+    from src.utils.volatility_surface import VolatilitySurface
+    return VolatilitySurface.from_quotes(*args)
+
 
 def render_application():
     """
@@ -48,6 +108,7 @@ def render_application():
            - **Greeks Analysis**: Analyze sensitivities like Delta, Gamma, and more.
            - **Risk Metrics**: Assess metrics like Value at Risk (VaR) and Conditional VaR (CVaR).
            - **Model Comparison**: Compare results from different pricing models.
+           - **Strategy Builder**: Combine option legs and analyze their P&L and Greeks.
            - **Historical Data**: Fetch and analyze historical stock data.
         """)
 
@@ -58,45 +119,109 @@ def render_application():
         K = st.slider("Strike Price ($)", min_value=10.0, max_value=500.0, value=100.0, step=1.0)
         T = st.slider("Time to Maturity (years)", min_value=0.1, max_value=5.0, value=1.0, step=0.1)
         r = st.slider("Risk-Free Rate (%)", min_value=0.0, max_value=10.0, value=5.0, step=0.1) / 100
-        sigma = st.slider("Volatility (%)", min_value=1.0, max_value=200.0, value=20.0, step=1.0) / 100
+        # Keyed so the Historical Data view can set it from a realized volatility estimate
+        st.session_state.setdefault("sigma_pct", 20.0)
+        sigma = st.slider("Volatility (%)", min_value=1.0, max_value=200.0, step=1.0, key="sigma_pct") / 100
         option_type = st.radio("Option Type", ["Call", "Put"])
         confidence_level = st.slider("Confidence Level for Risk Metrics", 0.9, 0.99, 0.95, step=0.01)
         n_simulations = st.number_input("Monte Carlo Simulations", min_value=1000, max_value=100000, value=10000, step=1000)
         model = st.radio("Pricing Model", ["Black-Scholes", "Heston", "SABR"])
+        exercise = st.radio("Exercise Style", ["European", "American"], horizontal=True)
+        grid_backend = {"Analytic": 'analytic', "Finite Difference": 'pde'}[
+            st.radio("Heatmap & Greeks Backend", ["Analytic", "Finite Difference"], horizontal=True)
+        ]
+        heston_method = {"Monte Carlo": "mc", "Analytic": "analytic"}[st.radio("Heston Method", ["Monte Carlo", "Analytic"])]
+        variance_reduction = VARIANCE_REDUCTION_OPTIONS[st.selectbox("Monte Carlo Variance Reduction", list(VARIANCE_REDUCTION_OPTIONS))]
         st.markdown("---")
 
     if T <= 0 or sigma <= 0 or S <= 0:
         st.error("Invalid input: Ensure T, S, and sigma are greater than zero!")
 
-    # Main Tabs
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
-        ["Option Pricing", "Greeks Analysis", "Risk Metrics", "Model Comparison", "Historical Data", "Case Studies"]
+    # Main Views: st.tabs runs every tab body on each rerun, so only the selected view is rendered
+    view = st.radio(
+        "View",
+        ["Option Pricing", "Greeks Analysis", "Risk Metrics", "Model Comparison", "Strategy Builder", "Historical Data",
+         "Case Studies"],
+        horizontal=True,
+        label_visibility="collapsed",
     )
 
-    # Tab 1: Option Pricing
-    with tab1:
+    # View 1: Option Pricing
+    if view == "Option Pricing":
         st.subheader("📊 Option Pricing")
         if model == "Black-Scholes":
-            price = calculate_black_scholes(S, K, T, r, sigma, option_type.lower())
+            price = cached_black_scholes(S, K, T, r, sigma, option_type.lower())
         elif model == "Heston":
-            price = heston_model(S, K, T, r, v0=0.04, kappa=2.0, theta=0.04, sigma=0.2, rho=-0.7, option_type=option_type.lower())
+            price, price_stderr = cached_heston_model(S, K, T, r, v0=0.04, kappa=2.0, theta=0.04, sigma=0.2, rho=-0.7, option_type=option_type.lower(), method=heston_method, variance_reduction=variance_reduction)
         elif model == "SABR":
-            price = sabr_model(S, K, T, alpha=0.2, beta=0.5, rho=-0.3, nu=0.4, option_type=option_type.lower())
+            price = cached_sabr_model(S, K, T, alpha=0.2, beta=0.5, rho=-0.3, nu=0.4, option_type=option_type.lower(), r=r)
         
         st.metric(f"{model} {option_type} Option Price", f"${price:.2f}")
+        if model == "Heston" and heston_method == "mc":
+            st.caption(f"Monte Carlo standard error: ${price_stderr:.4f}")
+
+        if exercise == "American":
+            if model == "Black-Scholes":
+                american_price = cached_lattice_price(S, K, T, r, sigma, option_type.lower())
+                st.metric(f"American {option_type} Price (binomial lattice)", f"${american_price:.2f}",
+                          delta=f"{american_price - price:.4f} early exercise premium", delta_color="off")
+            elif model == "Heston":
+                american_price, american_stderr = cached_lsm_heston(
+                    S, K, T, r, v0=0.04, kappa=2.0, theta=0.04, sigma=0.2, rho=-0.7,
+                    option_type=option_type.lower(), n_simulations=min(n_simulations, 20000), rng=42,
+                )
+                st.metric(f"American {option_type} Price (Longstaff-Schwartz)", f"${american_price:.2f}",
+                          delta=f"{american_price - price:.4f} early exercise premium", delta_color="off")
+                st.caption(f"Monte Carlo standard error: ${american_stderr:.4f}")
+            else:
+                st.info("American exercise is available for the Black-Scholes and Heston models.")
 
         st.markdown("### Sensitivity Heatmap")
-        S_range = np.linspace(max(10, S - 50), S + 50, 50)
-        sigma_range = np.linspace(max(0.05, sigma - 0.2), sigma + 0.2, 50)
-        heatmap = create_interactive_heatmap(S_range, sigma_range, K, T, r, option_type.lower())
+        col1, col2 = st.columns(2)
+        axes = col1.selectbox("Heatmap Axes", list(HEATMAP_AXES))
+        resolution = col2.slider("Heatmap Resolution", min_value=10, max_value=1000, value=50, step=10)
+        x_param, y_param = HEATMAP_AXES[axes]
+        axis_ranges = {
+            'S': np.linspace(max(10, S - 50), S + 50, resolution),
+            'K': np.linspace(max(10, K - 50), K + 50, resolution),
+            'T': np.linspace(0.05, 2 * T, resolution),
+            'sigma': np.linspace(max(0.05, sigma - 0.2), sigma + 0.2, resolution),
+        }
+        # Only the finite-difference backend handles early exercise
+        grid_exercise = exercise.lower() if grid_backend == 'pde' else 'european'
+        if exercise == "American" and grid_backend == 'analytic':
+            st.caption("The analytic heatmap shows European prices; choose the Finite Difference backend for American.")
+        # An implied vol surface replaces the flat sigma unless sigma is itself an axis
+        heatmap_sigma = sigma
+        quotes_file = st.file_uploader("Implied Volatility Quotes (CSV with K, T, iv columns)", type="csv")
+        if quotes_file is not None:
+            import pandas as pd
+
+            quotes = pd.read_csv(quotes_file)
+            surface = cached_vol_surface(S, r, quotes['K'].to_numpy(), quotes['T'].to_numpy(),
+                                         quotes['iv'].to_numpy())
+            arbitrage = surface.check_arbitrage(strikes=np.unique(quotes['K'].to_numpy()))
+            if arbitrage['arbitrage_free']:
+                st.caption(f"SVI surface with {surface.expiries.size} slices, free of static arbitrage.")
+            else:
+                st.warning(f"The fitted surface has static arbitrage: {arbitrage}")
+            if 'sigma' in (x_param, y_param) or grid_backend == 'pde':
+                st.caption("The surface is ignored when volatility is a heatmap axis or with the Finite Difference backend.")
+            else:
+                heatmap_sigma = surface
+        heatmap = cached_heatmap(x_param, axis_ranges[x_param], y_param, axis_ranges[y_param],
+                                 S, K, T, r, heatmap_sigma, option_type.lower(), grid_backend, grid_exercise)
         st.plotly_chart(heatmap, use_container_width=True)
 
-    # Tab 2: Greeks Analysis
-    with tab2:
+    # View 2: Greeks Analysis
+    if view == "Greeks Analysis":
         st.subheader("📉 Greeks Analysis")
         st.markdown("Analyze the sensitivities of the option price to various factors:")
 
-        greeks = calculate_greeks(S, K, T, r, sigma)
+        if grid_backend == 'pde':
+            greeks = cached_fd_greeks(S, K, T, r, sigma, option_type.lower(), exercise.lower())
+        else:
+            greeks = cached_greeks(S, K, T, r, sigma, option_type.lower())
 
         # Create styled cards for each Greek
         greek_names = ["Delta", "Gamma", "Theta", "Vega", "Rho"]
@@ -123,40 +248,147 @@ def render_application():
                 st.markdown(f"<p style='text-align: center; font-size: 18px; color: #ffffff;'><b>{value}</b></p>", unsafe_allow_html=True)
                 st.markdown(f"<p style='text-align: center; color: #aaaaaa;'>{description}</p>", unsafe_allow_html=True)
 
-    # Tab 3: Risk Metrics
-    with tab3:
+        st.markdown("### Higher-Order Greeks")
+        higher_order = {
+            "Vanna": ('vanna', "Change of Delta with volatility."),
+            "Volga": ('volga', "Change of Vega with volatility."),
+            "Charm": ('charm', "Change of Delta over time."),
+            "Speed": ('speed', "Rate of change of Gamma."),
+        }
+        cols = st.columns(len(higher_order))
+        for col, (name, (key, description)) in zip(cols, higher_order.items()):
+            col.metric(name, f"{greeks[key]:.4f}", help=description)
+
+    # View 3: Risk Metrics
+    if view == "Risk Metrics":
         st.subheader("📊 Risk Metrics")
-        var = calculate_var(S, K, T, r, sigma, option_type.lower(), confidence_level, n_simulations)
-        es = calculate_expected_shortfall(S, K, T, r, sigma, option_type.lower(), confidence_level, n_simulations)
         col1, col2 = st.columns(2)
-        col1.metric("Value at Risk (VaR)", f"${abs(var):.2f}")
-        col2.metric("Conditional VaR (CVaR)", f"${abs(es):.2f}")
+        risk_method = RISK_METHODS[col1.selectbox("Risk Method", list(RISK_METHODS))]
+        revaluation = {"Full": 'full', "Delta-Gamma": 'delta_gamma'}[
+            col2.radio("Revaluation", ["Full", "Delta-Gamma"], horizontal=True)
+        ]
+        # Approximate runs fully reprice a sample of tail scenarios to report their error
+        error_check = 100 if revaluation != 'full' else 0
+        if risk_method == 'mc':
+            horizon = col2.number_input("Horizon (trading days)", min_value=0, max_value=60, value=0,
+                                        help="0 shocks the spot over the whole maturity")
+            risk = cached_option_risk(S, K, T, r, sigma, option_type.lower(), confidence_level, n_simulations,
+                                      variance_reduction=variance_reduction, horizon=horizon or None,
+                                      revaluation=revaluation, error_check=error_check)
+        else:
+            horizon = col2.number_input("Horizon (trading days)", min_value=1, max_value=60, value=1)
+            # Scenarios come from the data fetched in the Historical Data view, or the bundled sample
+            history = st.session_state.get("historical_data")
+            if history is None:
+                from src.utils.historical_data import CSVSource
+                history = CSVSource().fetch("AAPL", "1900-01-01", "2100-01-01")
+            risk = cached_historical_risk(S, K, T, r, sigma, option_type.lower(), confidence_level,
+                                          history['Close'].to_numpy(dtype=float), horizon, risk_method,
+                                          revaluation=revaluation, error_check=error_check)
 
-    # Tab 4: Model Comparison
-    with tab4:
+        if risk is None:
+            st.error("Not enough data to compute risk metrics.")
+        else:
+            var, es = risk['var'], risk['es']
+            col1, col2 = st.columns(2)
+            col1.metric("Value at Risk (VaR)", f"${abs(var):.2f}")
+            col2.metric("Conditional VaR (CVaR)", f"${abs(es):.2f}")
+            if 'var_stderr' in risk:
+                col1.caption(f"Standard error: ${risk['var_stderr']:.4f}")
+                col2.caption(f"Standard error: ${risk['es_stderr']:.4f}")
+            else:
+                st.caption(f"{len(risk['values']):,} overlapping historical scenarios")
+            if 'revaluation_error' in risk:
+                check = risk['revaluation_error']
+                st.caption(f"Delta-gamma error over {check['scenarios']} fully repriced tail scenarios: "
+                           f"mean ${check['mean_error']:.4f}, max ${check['max_abs_error']:.4f}")
+
+    # View 4: Model Comparison
+    if view == "Model Comparison":
         st.subheader("📚 Model Comparison")
-        bs_price = calculate_black_scholes(S, K, T, r, sigma, option_type.lower())
-        heston_price = heston_model(S, K, T, r, v0=0.04, kappa=2.0, theta=0.04, sigma=0.2, rho=-0.7, option_type=option_type.lower())
-        sabr_price = sabr_model(S, K, T, alpha=0.2, beta=0.5, rho=-0.3, nu=0.4, option_type=option_type.lower())
+        bs_price = cached_black_scholes(S, K, T, r, sigma, option_type.lower())
+        heston_price, _ = cached_heston_model(S, K, T, r, v0=0.04, kappa=2.0, theta=0.04, sigma=0.2, rho=-0.7, option_type=option_type.lower(), method=heston_method, variance_reduction=variance_reduction)
+        sabr_price = cached_sabr_model(S, K, T, alpha=0.2, beta=0.5, rho=-0.3, nu=0.4, option_type=option_type.lower(), r=r)
 
         col1, col2, col3 = st.columns(3)
         col1.metric("Black-Scholes Price", f"${bs_price:.2f}")
         col2.metric("Heston Price", f"${heston_price:.2f}")
         col3.metric("SABR Price", f"${sabr_price:.2f}")
 
-    # Tab 5: Historical Data
-    with tab5:
+    # View 5: Strategy Builder
+    if view == "Strategy Builder":
+        from src.utils.strategy_simulation import (
+            STRATEGY_GREEKS, STRATEGY_PRESETS, evaluate_strategy, make_legs, strategy_legs,
+        )
+        from src.utils.visualization import create_strategy_figure, create_strategy_greeks_figure
+        import pandas as pd
+
+        st.subheader("🧩 Strategy Builder")
+        preset = st.selectbox("Preset", list(STRATEGY_PRESETS), format_func=lambda name: name.replace('_', ' ').title())
+        legs = strategy_legs(preset, K, T)
+        # Presets are centred on the sidebar strike and maturity; every leg can be edited
+        table = st.data_editor(
+            pd.DataFrame({
+                'type': np.where(legs['is_call'], 'call', 'put'),
+                'strike': legs['strike'],
+                'expiry': legs['expiry'],
+                'quantity': legs['quantity'],
+            }),
+            column_config={'type': st.column_config.SelectboxColumn(options=['call', 'put'], required=True)},
+            num_rows="dynamic",
+            key=f"legs_{preset}",
+        ).dropna()
+
+        if table.empty:
+            st.warning("Add at least one leg.")
+        else:
+            legs = make_legs(table['type'], table['strike'], table['expiry'], table['quantity'])
+            times = np.linspace(0, legs['expiry'].min(), 4)
+            result = evaluate_strategy(legs, np.linspace(0.5 * S, 1.5 * S, 301), r, sigma, S, times)
+
+            col1, col2 = st.columns(2)
+            col1.metric("Net Premium", f"${result['cost']:.2f}")
+            col2.metric("Breakevens at First Expiry", ", ".join(f"${b:.2f}" for b in result['breakevens']) or "None")
+            st.plotly_chart(create_strategy_figure(result, preset.replace('_', ' ').title()), use_container_width=True)
+            greek = st.selectbox("Greek", STRATEGY_GREEKS, format_func=str.capitalize)
+            st.plotly_chart(create_strategy_greeks_figure(result, greek), use_container_width=True)
+
+    # View 6: Historical Data
+    if view == "Historical Data":
         st.subheader("🔍 Historical Data")
         ticker = st.text_input("Enter Stock Ticker (e.g., AAPL)", value="AAPL")
         start_date = st.date_input("Start Date", value=datetime.date(2020, 1, 1))
         end_date = st.date_input("End Date", value=datetime.date(2023, 1, 1))
 
         if st.button("Fetch Data"):
-            historical_data = fetch_historical_data(ticker, start_date, end_date)
+            from src.utils.historical_data import HistoricalDataStore
+            # Only dates not already in the local store are downloaded
+            st.session_state["historical_data"] = HistoricalDataStore().get(ticker, start_date, end_date)
+
+        historical_data = st.session_state.get("historical_data")
+        if historical_data is not None:
             st.write(historical_data)
 
-     # Tab 6: Case Studies
-    with tab6:
+            from src.utils.volatility import ESTIMATORS, realized_volatility
+            st.markdown("### Realized Volatility")
+            col1, col2 = st.columns(2)
+            estimator = col1.selectbox("Estimator", ESTIMATORS, index=ESTIMATORS.index('yang_zhang'),
+                                       format_func=lambda name: VOLATILITY_ESTIMATORS[name])
+            window = col2.slider("Rolling Window (days)", min_value=5, max_value=252, value=21)
+
+            estimates = {name: realized_volatility(historical_data, name, window) for name in ESTIMATORS}
+            st.line_chart({VOLATILITY_ESTIMATORS[name]: series * 100 for name, series in estimates.items()})
+            latest = estimates[estimator].dropna()
+            if latest.empty:
+                st.warning("Not enough data for the selected window.")
+            else:
+                latest_pct = float(np.clip(np.round(latest.iloc[-1] * 100), 1.0, 200.0))
+                st.metric(f"Latest {VOLATILITY_ESTIMATORS[estimator]} Volatility", f"{latest.iloc[-1]:.2%}")
+                st.button("Use as Pricing Volatility", on_click=st.session_state.__setitem__,
+                          args=("sigma_pct", latest_pct))
+
+    # View 7: Case Studies
+    if view == "Case Studies":
         st.subheader("📚 Case Studies")
         st.markdown("""
         Explore real-world applications of options analytics with the following case studies:
@@ -176,3 +408,9 @@ def render_application():
 
     # Add tooltips for guidance
     add_tooltips()
+
+    # Debug panel with cache statistics
+    with st.sidebar.expander("🛠️ Debug: Cache Statistics"):
+        st.table(cache_stats())
+        if st.button("Clear Caches"):
+            clear_caches()
@@ -0,0 +1,137 @@
+"""
+Load test for the pricing service.
+
+Usage:
+    python -m src.load_test --spawn --endpoint price --clients 64 --requests 200
+    python -m src.load_test --port 8000 --endpoint var --clients 4 --requests 5 --rows 10
+
+Every client keeps one HTTP connection open and sends its requests back to back,
+each pricing --rows random contracts. Requests/second, rows/second and client-side
+latency percentiles are reported, followed by the service's own /metrics.
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from src.utils.black_scholes import calculate_black_scholes_batch
+from src.utils.latency import LatencyHistogram
+
+ENDPOINTS = ('price', 'greeks', 'iv', 'var')
+
+
+def make_body(endpoint, rows, rng):
+    K = rng.uniform(80, 120, rows).round(2)
+    T = rng.uniform(0.1, 2.0, rows).round(3)
+    sigma = rng.uniform(0.1, 0.5, rows).round(3)
+    option_type = np.where(rng.random(rows) < 0.5, 'call', 'put')
+    body = {'S': 100.0, 'K': K.tolist(), 'T': T.tolist(), 'r': 0.03, 'option_type': option_type.tolist()}
+    if endpoint == 'iv':
+        body['price'] = calculate_black_scholes_batch(100.0, K, T, 0.03, sigma, option_type).tolist()
+    else:
+        body['sigma'] = sigma.tolist()
+    if endpoint == 'var':
+        body['n_simulations'] = 20_000
+    return body
+
+
+async def request(reader, writer, method, path, body=None):
+    """
+    Send one request on a keep-alive connection and return (status, decoded JSON payload).
+    """
+    data = b'' if body is None else json.dumps(body).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers['content-length'])))
+
+
+async def run_client(host, port, endpoint, n_requests, rows, seed, latency):
+    rng = np.random.default_rng(seed)
+    bodies = [make_body(endpoint, rows, rng) for _ in range(n_requests)]
+    reader, writer = await asyncio.open_connection(host, port)
+    errors = 0
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, 'POST', f'/{endpoint}', body)
+            latency.record(time.perf_counter() - start)
+            errors += status != 200
+    finally:
+        writer.close()
+    return errors
+
+
+async def load_test(host, port, endpoint, clients, n_requests, rows):
+    latency = LatencyHistogram()
+    start = time.perf_counter()
+    errors = await asyncio.gather(*(run_client(host, port, endpoint, n_requests, rows, seed, latency)
+                                    for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    total = clients * n_requests
+    summary = latency.summary()
+    print(f"{total:,} /{endpoint} requests ({sum(errors):,} errors) from {clients} clients in {elapsed:.2f}s: "
+          f"{total / elapsed:,.0f} requests/second, {total * rows / elapsed:,.0f} rows/second")
+    print(f"Client latency: p50 {summary['p50'] * 1e3:.2f} ms, p99 {summary['p99'] * 1e3:.2f} ms")
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, metrics = await request(reader, writer, 'GET', '/metrics')
+    finally:
+        writer.close()
+    print(json.dumps(metrics, indent=2))
+
+
+async def wait_for_port(host, port, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure requests/second against the pricing service.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--spawn', action='store_true', help="Start a pricing service subprocess for the test")
+    parser.add_argument('--endpoint', choices=ENDPOINTS, default='price')
+    parser.add_argument('--clients', type=int, default=64, help="Concurrent connections")
+    parser.add_argument('--requests', type=int, default=100, help="Requests per client")
+    parser.add_argument('--rows', type=int, default=1, help="Contracts per request")
+    args = parser.parse_args(argv)
+
+    service = None
+    if args.spawn:
+        service = subprocess.Popen([sys.executable, '-m', 'src.pricing_service', '--host', args.host,
+                                    '--port', str(args.port)])
+    try:
+        if service is not None:
+            asyncio.run(wait_for_port(args.host, args.port))
+        asyncio.run(load_test(args.host, args.port, args.endpoint, args.clients, args.requests, args.rows))
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+
+
+if __name__ == "__main__":
+    main()
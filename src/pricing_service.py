@@ -0,0 +1,308 @@
+"""
+Local HTTP pricing service with batch endpoints.
+
+Usage:
+    python -m src.pricing_service --port 8000 --workers 4
+
+Endpoints (JSON bodies; every field may be a scalar or a list, and fields are broadcast):
+    POST /price   S, K, T, r, sigma, option_type  -> price
+    POST /greeks  S, K, T, r, sigma, option_type  -> delta, gamma, theta, vega, rho, ...
+    POST /iv      S, K, T, r, price, option_type  -> iv, valid
+    POST /var     S, K, T, r, sigma, option_type, plus confidence_level, n_simulations, rng,
+                  variance_reduction, horizon and revaluation -> var, es, var_stderr, es_stderr
+    GET  /metrics request counts, errors, throughput and latency percentiles per endpoint
+
+option_type defaults to 'call'. Concurrent /price, /greeks and /iv requests are
+coalesced into one vectorized call per endpoint; /var runs every position's Monte
+Carlo simulation on a process pool, so the event loop never blocks on it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+from src.utils.black_scholes import calculate_black_scholes_batch, to_call_flag
+from src.utils.greeks import calculate_greeks
+from src.utils.implied_volatility import calculate_implied_volatility
+from src.utils.latency import LatencyHistogram
+from src.utils.parallel import get_executor
+from src.utils.risk_metrics import REVALUATION_METHODS, simulate_option_risk
+
+PRICING_FIELDS = ('S', 'K', 'T', 'r', 'sigma')
+IV_FIELDS = ('S', 'K', 'T', 'r', 'price')
+RISK_STATISTICS = ('var', 'es', 'var_stderr', 'es_stderr')
+DEFAULT_WINDOW = 0.002
+MAX_BATCH_ROWS = 100_000
+MAX_REQUEST_ROWS = 1_000_000
+MAX_SIMULATIONS = 1_000_000
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+def parse_columns(body, fields):
+    """
+    Broadcast the required fields and option_type of a request body into flat, equal-length arrays.
+
+    Returns:
+    - list: One float array per field followed by the boolean call flags
+    """
+    missing = [field for field in fields if field not in body]
+    if missing:
+        raise ValueError(f"Missing required fields: {missing}")
+    columns = np.broadcast_arrays(*(np.asarray(body[field], dtype=float) for field in fields),
+                                  to_call_flag(body.get('option_type', 'call')))
+    if columns[0].size > MAX_REQUEST_ROWS:
+        raise ValueError(f"At most {MAX_REQUEST_ROWS:,} rows per request")
+    return [column.ravel() for column in columns]
+
+
+def to_json_list(values):
+    # NaN is not valid JSON, so invalid results are sent as null
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        return np.where(np.isfinite(values), values, None).tolist()
+    return values.tolist()
+
+
+def _price_kernel(S, K, T, r, sigma, is_call):
+    return {'price': calculate_black_scholes_batch(S, K, T, r, sigma, is_call)}
+
+
+def _iv_kernel(S, K, T, r, price, is_call):
+    implied_vols, valid = calculate_implied_volatility(price, S, K, T, r, is_call)
+    return {'iv': implied_vols, 'valid': valid}
+
+
+def _position_risk(S, K, T, r, sigma, option_type, confidence_level, n_simulations, rng, variance_reduction,
+                   horizon, revaluation):
+    # Runs in a worker process; only the summary statistics are sent back, not the scenarios
+    risk = simulate_option_risk(S, K, T, r, sigma, option_type, confidence_level, n_simulations, rng=rng,
+                                variance_reduction=variance_reduction, horizon=horizon, revaluation=revaluation)
+    return None if risk is None else {name: float(risk[name]) for name in RISK_STATISTICS}
+
+
+class Coalescer:
+    """
+    Merge the rows of concurrent requests to one endpoint into a single vectorized kernel call.
+
+    A batch is flushed window seconds after its first request arrives, or as soon as it
+    holds max_rows rows. The kernel runs in a thread so the event loop keeps accepting
+    requests, and its result columns are sliced back out to every request.
+    """
+
+    def __init__(self, kernel, window=DEFAULT_WINDOW, max_rows=MAX_BATCH_ROWS):
+        self.kernel = kernel
+        self.window = window
+        self.max_rows = max_rows
+        self._pending = []
+        self._rows = 0
+        self._timer = None
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+
+    async def submit(self, columns):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((columns, future))
+        self._rows += columns[0].size
+        if self._rows >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._rows = self._pending, [], 0
+        if pending:
+            asyncio.ensure_future(self._run(pending))
+
+    async def _run(self, pending):
+        sizes = [columns[0].size for columns, _ in pending]
+        merged = [np.concatenate(parts) for parts in zip(*(columns for columns, _ in pending))]
+        self.batches += 1
+        self.requests += len(pending)
+        self.rows += sum(sizes)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(None, self.kernel, *merged)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        offsets = np.cumsum([0] + sizes)
+        for (_, future), start, stop in zip(pending, offsets[:-1], offsets[1:]):
+            if not future.done():
+                future.set_result({name: values[start:stop] for name, values in result.items()})
+
+    def stats(self):
+        return {'batches': self.batches, 'requests': self.requests, 'rows': self.rows,
+                'requests_per_batch': self.requests / max(self.batches, 1)}
+
+
+class ServiceMetrics:
+    """
+    Request counts, error counts and latency histograms per endpoint since start-up.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.endpoints = {}
+
+    def record(self, endpoint, status, seconds):
+        entry = self.endpoints.setdefault(endpoint, {'requests': 0, 'errors': 0, 'latency': LatencyHistogram()})
+        entry['requests'] += 1
+        entry['errors'] += status >= 400
+        entry['latency'].record(seconds)
+
+    def snapshot(self):
+        uptime = time.perf_counter() - self.started
+        endpoints = {}
+        for endpoint, entry in self.endpoints.items():
+            latency = entry['latency'].summary()
+            endpoints[endpoint] = {
+                'requests': entry['requests'],
+                'errors': entry['errors'],
+                'requests_per_second': entry['requests'] / uptime,
+                'latency_ms': {name: latency[name] * 1e3 for name in ('p50', 'p99', 'max')},
+            }
+        return {'uptime_seconds': uptime, 'endpoints': endpoints}
+
+
+class PricingService:
+    """
+    Minimal asyncio HTTP/1.1 server (keep-alive, JSON bodies) routing to the pricing endpoints.
+    """
+
+    def __init__(self, workers=None, window=DEFAULT_WINDOW):
+        self.workers = workers or os.cpu_count() or 1
+        self.metrics = ServiceMetrics()
+        self.coalescers = {
+            '/price': Coalescer(_price_kernel, window),
+            '/greeks': Coalescer(calculate_greeks, window),
+            '/iv': Coalescer(_iv_kernel, window),
+        }
+        self.routes = {
+            '/price': ('POST', self._vectorized),
+            '/greeks': ('POST', self._vectorized),
+            '/iv': ('POST', self._vectorized),
+            '/var': ('POST', self._var),
+            '/metrics': ('GET', self._metrics),
+        }
+
+    async def start(self, host='127.0.0.1', port=8000):
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def _vectorized(self, path, body):
+        fields = IV_FIELDS if path == '/iv' else PRICING_FIELDS
+        result = await self.coalescers[path].submit(parse_columns(body, fields))
+        return {name: to_json_list(values) for name, values in result.items()}
+
+    async def _var(self, path, body):
+        n_simulations = int(body.get('n_simulations', 10_000))
+        if not 0 < n_simulations <= MAX_SIMULATIONS:
+            raise ValueError(f"n_simulations must be between 1 and {MAX_SIMULATIONS:,}")
+        *inputs, is_call = parse_columns(body, PRICING_FIELDS)
+        horizon = body.get('horizon')
+        revaluation = body.get('revaluation', 'full')
+        if revaluation not in REVALUATION_METHODS:
+            raise ValueError(f"Unknown revaluation method: {revaluation}")
+        options = (float(body.get('confidence_level', 0.95)), n_simulations, body.get('rng', 42),
+                   body.get('variance_reduction'), None if horizon is None else int(horizon), revaluation)
+        loop = asyncio.get_running_loop()
+        executor = get_executor(self.workers)
+        risks = await asyncio.gather(*(
+            loop.run_in_executor(executor, _position_risk, *map(float, row), 'call' if call else 'put', *options)
+            for *row, call in zip(*inputs, is_call)
+        ))
+        return {name: [None if risk is None else risk[name] for risk in risks] for name in RISK_STATISTICS}
+
+    async def _metrics(self, path, body):
+        snapshot = self.metrics.snapshot()
+        snapshot['coalescing'] = {endpoint: coalescer.stats() for endpoint, coalescer in self.coalescers.items()}
+        return snapshot
+
+    async def dispatch(self, method, path, body):
+        """
+        Route one request and return (status, JSON-serializable payload).
+        """
+        if path not in self.routes:
+            return 404, {'error': f"Unknown endpoint: {path}"}
+        expected, handler = self.routes[path]
+        if method != expected:
+            return 405, {'error': f"{path} expects {expected}"}
+        try:
+            payload = json.loads(body) if body else {}
+            if not isinstance(payload, dict):
+                raise ValueError("The request body must be a JSON object")
+            return 200, await handler(path, payload)
+        except (ValueError, TypeError) as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                started = time.perf_counter()
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                path = target.split('?', 1)[0]
+                status, payload = await self.dispatch(method, path, body)
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    .encode() + data
+                )
+                await writer.drain()
+                if path in self.routes:
+                    self.metrics.record(path, status, time.perf_counter() - started)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # Malformed request or client went away
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=8000, workers=None, window=DEFAULT_WINDOW):
+    server = await PricingService(workers, window).start(host, port)
+    print(f"Pricing service listening on http://{host}:{server.sockets[0].getsockname()[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve batch pricing, Greeks, implied vol and VaR over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None, help="Monte Carlo worker processes (default: CPU count)")
+    parser.add_argument('--window', type=float, default=DEFAULT_WINDOW,
+                        help="Seconds to wait for concurrent requests to coalesce")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.window))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
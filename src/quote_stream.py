@@ -0,0 +1,337 @@
+"""
+Streaming implied volatilities and Greeks for a feed of option quote updates.
+
+Usage:
+    python -m src.quote_stream results.csv --replay quotes.csv --speed 10
+    python -m src.quote_stream results.csv --synthetic 200000 --via-socket
+
+Quote files need columns contract, S, K, T, r and price, plus an optional
+option_type column ('call'/'put', defaults to 'call') and an optional timestamp
+column (seconds) used to pace the replay. Updates are collected per
+micro-interval, only contracts whose inputs changed are repriced, and every
+batch of results is appended to the output file.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.batch_pricing import DEFAULT_CHUNK_SIZE, GREEK_COLUMNS, ChunkWriter, read_chunks
+from src.utils.black_scholes import calculate_black_scholes_batch, to_call_flag
+from src.utils.greeks import calculate_greeks
+from src.utils.implied_volatility import calculate_implied_volatility
+from src.utils.latency import LatencyHistogram
+
+QUOTE_FIELDS = ('S', 'K', 'T', 'r', 'price')
+STAGES = ('queue', 'compute', 'sink', 'end_to_end')
+DEFAULT_INTERVAL = 0.05
+DEFAULT_QUEUE_SIZE = 10_000
+
+
+class QuoteBook:
+    """
+    Latest inputs of every contract seen on the stream, one row per contract.
+    """
+
+    def __init__(self, capacity=1024):
+        self.rows = {}
+        self.contracts = []
+        # Columns: QUOTE_FIELDS followed by the call flag
+        self.inputs = np.full((capacity, len(QUOTE_FIELDS) + 1), np.nan)
+
+    def update(self, contracts, inputs):
+        """
+        Store the latest inputs of distinct contracts and return the rows that are new or changed.
+        """
+        rows = np.empty(len(contracts), dtype=np.intp)
+        for i, contract in enumerate(contracts):
+            row = self.rows.get(contract)
+            if row is None:
+                row = self.rows[contract] = len(self.contracts)
+                self.contracts.append(contract)
+            rows[i] = row
+        if len(self.contracts) > len(self.inputs):
+            capacity = max(len(self.contracts), 2 * len(self.inputs))
+            grown = np.full((capacity, self.inputs.shape[1]), np.nan)
+            grown[:len(self.inputs)] = self.inputs
+            self.inputs = grown
+
+        # New rows hold NaN, which never compares equal, so they always count as changed
+        changed = np.any(self.inputs[rows] != inputs, axis=1)
+        rows = rows[changed]
+        self.inputs[rows] = inputs[changed]
+        return rows
+
+    def reprice(self, rows):
+        """
+        Implied volatility and Greeks (at that volatility) of the given rows.
+        """
+        S, K, T, r, price, is_call = self.inputs[rows].T
+        is_call = is_call > 0
+        implied_vols, valid = calculate_implied_volatility(price, S, K, T, r, is_call)
+        greeks = calculate_greeks(S, K, T, r, implied_vols, is_call)
+        result = pd.DataFrame({
+            'contract': [self.contracts[row] for row in rows],
+            'S': S, 'K': K, 'T': T, 'r': r,
+            'option_type': np.where(is_call, 'call', 'put'),
+            'price': price,
+            'iv': implied_vols,
+            'valid': valid,
+        })
+        for name in GREEK_COLUMNS:
+            result[name] = greeks[name]
+        return result
+
+
+class QuotePipeline:
+    """
+    Asyncio pipeline from a quote source to a result sink, in four stages joined by bounded queues.
+
+    - ingest: parses quotes from the source and stamps their arrival time
+    - batch: collects updates for one micro-interval (or until max_batch updates)
+    - compute: keeps the last update per contract, and reprices only contracts whose
+      inputs changed, in a worker thread so ingestion keeps running meanwhile
+    - publish: hands each non-empty result DataFrame to the sink (a function or coroutine function)
+
+    Every queue is bounded, so a slow sink stalls compute, then batching, then ingestion,
+    and the source is only read as fast as results are consumed. Latency histograms are
+    kept for the time updates wait before their batch is computed ('queue'), the compute
+    and sink time per batch, and the arrival-to-published time per update ('end_to_end').
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, max_batch=DEFAULT_QUEUE_SIZE, queue_size=DEFAULT_QUEUE_SIZE):
+        self.interval = interval
+        self.max_batch = max_batch
+        self.queue_size = queue_size
+        self.book = QuoteBook()
+        self.latency = {stage: LatencyHistogram() for stage in STAGES}
+        self.counts = dict.fromkeys(('updates', 'rejected', 'batches', 'repriced', 'backpressure_waits'), 0)
+
+    async def run(self, source, sink):
+        """
+        Consume an async iterable of quote mappings until it is exhausted.
+
+        Returns:
+        - dict: Update, batch and repricing counts plus a latency summary per stage (in seconds)
+        """
+        self._updates = asyncio.Queue(self.queue_size)
+        self._batches = asyncio.Queue(2)
+        self._results = asyncio.Queue(2)
+        await asyncio.gather(self._ingest(source), self._batch(), self._compute(), self._publish(sink))
+        return self.stats()
+
+    def stats(self):
+        return {**self.counts, 'latency': {stage: histogram.summary() for stage, histogram in self.latency.items()}}
+
+    async def _ingest(self, source):
+        async for quote in source:
+            try:
+                update = (quote['contract'], *(float(quote[field]) for field in QUOTE_FIELDS),
+                          quote.get('option_type', 'call'), time.perf_counter())
+            except (KeyError, TypeError, ValueError):
+                self.counts['rejected'] += 1
+                continue
+            self.counts['updates'] += 1
+            if self._updates.full():
+                self.counts['backpressure_waits'] += 1
+            await self._updates.put(update)
+        await self._updates.put(None)
+
+    async def _batch(self):
+        loop = asyncio.get_running_loop()
+        finished = False
+        while not finished:
+            first = await self._updates.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = loop.time() + self.interval
+            while len(batch) < self.max_batch:
+                try:
+                    update = self._updates.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        update = await asyncio.wait_for(self._updates.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if update is None:
+                    finished = True
+                    break
+                batch.append(update)
+            await self._batches.put(batch)
+        await self._batches.put(None)
+
+    def _reprice(self, batch):
+        # The last update of each contract in the batch wins
+        latest = {update[0]: update for update in batch}
+        updates = list(latest.values())
+        inputs = np.empty((len(updates), len(QUOTE_FIELDS) + 1))
+        inputs[:, :-1] = [update[1:-2] for update in updates]
+        inputs[:, -1] = to_call_flag([update[-2] for update in updates])
+        rows = self.book.update(list(latest), inputs)
+        return self.book.reprice(rows)
+
+    async def _compute(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._batches.get()
+            if batch is None:
+                break
+            started = time.perf_counter()
+            arrivals = np.array([update[-1] for update in batch])
+            self.latency['queue'].record(started - arrivals)
+            result = await loop.run_in_executor(None, self._reprice, batch)
+            self.latency['compute'].record(time.perf_counter() - started)
+            self.counts['batches'] += 1
+            self.counts['repriced'] += len(result)
+            await self._results.put((result, arrivals))
+        await self._results.put(None)
+
+    async def _publish(self, sink):
+        while True:
+            item = await self._results.get()
+            if item is None:
+                break
+            result, arrivals = item
+            started = time.perf_counter()
+            if len(result):
+                published = sink(result)
+                if inspect.isawaitable(published):
+                    await published
+            finished = time.perf_counter()
+            self.latency['sink'].record(finished - started)
+            self.latency['end_to_end'].record(finished - arrivals)
+
+
+async def replay_file(path, speed=0.0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield quote updates from a CSV or Parquet file.
+
+    With speed > 0 and a timestamp column, the original spacing of the updates is
+    replayed speed times faster; otherwise updates are yielded as fast as they are consumed.
+    """
+    start = time.perf_counter()
+    first_timestamp = None
+    for frame in read_chunks(path, chunk_size):
+        for quote in frame.to_dict('records'):
+            if speed > 0 and 'timestamp' in quote:
+                if first_timestamp is None:
+                    first_timestamp = quote['timestamp']
+                delay = (quote['timestamp'] - first_timestamp) / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield quote
+        await asyncio.sleep(0)
+
+
+async def synthetic_quotes(n_updates, S=100.0, r=0.03, strikes=None, expiries=(0.1, 0.25, 0.5, 1.0),
+                           quotes_per_tick=20, rng=None):
+    """
+    Stand-in feed of random quote updates on one underlying.
+
+    Every tick the spot moves with probability one half and a random subset of contracts
+    is requoted off a skewed smile, so some updates repeat a contract's previous inputs.
+    """
+    rng = np.random.default_rng(rng)
+    strikes = np.linspace(70, 130, 25) if strikes is None else np.asarray(strikes, dtype=float)
+    K, T, is_call = (x.ravel() for x in np.meshgrid(strikes, expiries, [True, False], indexing='ij'))
+    contracts = [f"{'C' if call else 'P'}{k:g}@{t:g}" for k, t, call in zip(K, T, is_call)]
+    for _ in range(0, n_updates, quotes_per_tick):
+        if rng.random() < 0.5:
+            S = round(S * np.exp(0.001 * rng.standard_normal()), 2)
+        quoted = rng.choice(K.size, min(quotes_per_tick, K.size), replace=False)
+        vols = 0.2 - 0.1 * np.log(K[quoted] / S)
+        prices = np.round(calculate_black_scholes_batch(S, K[quoted], T[quoted], r, vols, is_call[quoted]), 2)
+        for index, price in zip(quoted, prices):
+            yield {'contract': contracts[index], 'S': S, 'K': K[index], 'T': T[index], 'r': r,
+                   'option_type': 'call' if is_call[index] else 'put', 'price': price}
+        await asyncio.sleep(0)
+
+
+async def socket_source(host, port):
+    """
+    Yield quote updates read as JSON lines from a TCP connection until the peer closes it.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            yield json.loads(line)
+    finally:
+        writer.close()
+
+
+async def serve_quotes(source, host='127.0.0.1', port=0):
+    """
+    Stand-in for an exchange connection: stream a quote source as JSON lines to the first client.
+
+    The writer drains after every line, so TCP flow control carries the pipeline's
+    backpressure back to the source. Returns the asyncio server; the bound port is
+    server.sockets[0].getsockname()[1].
+    """
+    async def handle(reader, writer):
+        async for quote in source:
+            writer.write(json.dumps(quote, default=lambda value: value.item()).encode() + b'\n')
+            await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def stream_to_file(source, output_path, via_socket=False, **pipeline_options):
+    """
+    Run a quote source through a QuotePipeline into a CSV or Parquet results file.
+
+    Returns:
+    - dict: The pipeline statistics
+    """
+    writer = ChunkWriter(output_path)
+    server = None
+    try:
+        if via_socket:
+            server = await serve_quotes(source)
+            source = socket_source(*server.sockets[0].getsockname()[:2])
+        return await QuotePipeline(**pipeline_options).run(source, writer.write)
+    finally:
+        writer.close()
+        if server is not None:
+            server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream quote updates into implied volatilities and Greeks.")
+    parser.add_argument('output', help="Results file (.csv or .parquet)")
+    feed = parser.add_mutually_exclusive_group(required=True)
+    feed.add_argument('--replay', metavar='PATH', help="Quote file to replay (.csv or .parquet)")
+    feed.add_argument('--synthetic', type=int, metavar='N', help="Generate N random quote updates")
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help="Replay timestamps this many times faster (0 replays as fast as possible)")
+    parser.add_argument('--via-socket', action='store_true', help="Serve the feed over a local TCP socket")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help="Micro-batch interval in seconds")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE)
+    args = parser.parse_args(argv)
+
+    source = replay_file(args.replay, args.speed) if args.replay else synthetic_quotes(args.synthetic, rng=0)
+    start = time.perf_counter()
+    stats = asyncio.run(stream_to_file(source, args.output, args.via_socket, interval=args.interval,
+                                       max_batch=args.queue_size, queue_size=args.queue_size))
+    elapsed = time.perf_counter() - start
+
+    print(f"{stats['updates']:,} updates ({stats['rejected']:,} rejected) in {stats['batches']:,} batches, "
+          f"{stats['repriced']:,} contracts repriced in {elapsed:.2f}s "
+          f"({stats['updates'] / max(elapsed, 1e-9):,.0f} updates/second)")
+    for stage, summary in stats['latency'].items():
+        print(f"  {stage:<11} p50 {summary['p50'] * 1e3:8.3f} ms   p99 {summary['p99'] * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
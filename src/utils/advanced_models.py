@@ -1,9 +1,208 @@
+import functools
+
 import numpy as np
-from scipy.stats import norm
+from scipy.special import ndtr
+from .black_scholes import calculate_black_scholes, calculate_black_scholes_batch, to_call_flag
+from .parallel import map_simulation_chunks, split_simulations
+from .variance_reduction import (ERROR_BATCHES, combine_estimates, effective_samples, normal_stream,
+                                 parse_variance_reduction)
+
+HESTON_SCHEMES = ('euler', 'qe')
+MAX_QUADRATURE_POINTS = 8192
+
+
+def generate_heston_paths(S, T, r, v0, kappa, theta, sigma, rho, n_simulations=10000, n_steps=None,
+                          scheme='euler', rng=None, normals=None):
+    """
+    Step all Heston paths at once, yielding the log-spot and variance arrays after every time step.
+
+    Parameters:
+    - S, T, r, v0, kappa, theta, sigma, rho: Heston model inputs (see heston_model)
+    - n_simulations (int): Number of paths stepped in parallel
+    - n_steps (int): Number of time steps (defaults to 252 per year)
+    - scheme (str): 'euler' (full-truncation Euler) or 'qe' (Andersen quadratic-exponential)
+    - rng (numpy.random.Generator or int): Random generator or seed
+    - normals (iterable): Optional source of one (2, n_simulations) array of standard normals
+      per step (see variance_reduction.normal_stream); drawn from rng when omitted
+
+    Yields:
+    - tuple: (log S_t, v_t) arrays of shape (n_simulations,), updated in place by the next step
+    """
+    if scheme not in HESTON_SCHEMES:
+        raise ValueError(f"Unknown scheme: {scheme}")
+    if n_steps is None:
+        n_steps = max(int(T * 252), 1)
+    dt = T / n_steps
+    if normals is None:
+        normals = normal_stream(n_steps, 2, n_simulations, rng)
+
+    log_S = np.full(n_simulations, np.log(S))
+    v = np.full(n_simulations, float(v0))
+    rho_bar = np.sqrt(1 - rho**2)
+
+    if scheme == 'qe':
+        # Andersen (2008) constants, central discretization (gamma1 = gamma2 = 0.5)
+        exp_kdt = np.exp(-kappa * dt)
+        c1 = sigma**2 * exp_kdt * (1 - exp_kdt) / kappa
+        c2 = theta * sigma**2 * (1 - exp_kdt)**2 / (2 * kappa)
+        k0 = -rho * kappa * theta * dt / sigma
+        k1 = 0.5 * dt * (kappa * rho / sigma - 0.5) - rho / sigma
+        k2 = 0.5 * dt * (kappa * rho / sigma - 0.5) + rho / sigma
+        k3 = 0.5 * dt * rho_bar**2
+        psi_c = 1.5
+
+    for _, (Z1, Z2) in zip(range(n_steps), normals):
+        if scheme == 'euler':
+            v_plus = np.maximum(v, 0)
+            sqrt_v_dt = np.sqrt(v_plus * dt)
+            log_S += (r * dt - 0.5 * dt * v_plus) + sqrt_v_dt * Z1
+            v += (kappa * dt) * (theta - v_plus) + sigma * sqrt_v_dt * (rho * Z1 + rho_bar * Z2)
+        else:
+            m = theta + (v - theta) * exp_kdt
+            psi = (v * c1 + c2) / m**2
+
+            # Quadratic branch for low psi, exponential branch with a mass at zero otherwise
+            inv_psi = 2 / np.minimum(psi, psi_c)
+            b2 = inv_psi - 1 + np.sqrt(inv_psi * (inv_psi - 1))
+            v_next = m / (1 + b2) * (np.sqrt(b2) + Z2)**2
+            exponential = np.flatnonzero(psi > psi_c)
+            if exponential.size:
+                # Both branches invert the same uniform, as in Andersen's original scheme
+                U = ndtr(Z2[exponential])
+                p = (psi[exponential] - 1) / (psi[exponential] + 1)
+                beta = (1 - p) / m[exponential]
+                v_next[exponential] = np.where(U <= p, 0.0, np.log((1 - p) / np.maximum(1 - U, 1e-300)) / beta)
+
+            log_S += r * dt + k0 + k1 * v + k2 * v_next + np.sqrt(k3 * (v + v_next)) * Z1
+            v = v_next
+
+        yield log_S, v
+
+
+HESTON_METHODS = ('mc', 'analytic')
 
-def heston_model(S, K, T, r, v0, kappa, theta, sigma, rho, option_type='call', n_simulations=10000):
+
+def heston_characteristic_function(u, S, T, r, v0, kappa, theta, sigma, rho):
     """
-    Heston Model for option pricing using Monte Carlo simulation.
+    Characteristic function of log S_T under Heston, in the "little Heston trap" form
+    of Albrecher et al. (2007), which stays on the principal branch of the complex log.
+
+    Parameters:
+    - u (array_like): Points at which to evaluate (may be complex)
+    - S, T, r, v0, kappa, theta, sigma, rho: Heston model inputs (see heston_model)
+
+    Returns:
+    - numpy.ndarray: E[exp(i u log S_T)]
+    """
+    iu = 1j * np.asarray(u)
+    beta = kappa - rho * sigma * iu
+    d = np.sqrt(beta**2 + sigma**2 * (iu - iu**2))
+    g = (beta - d) / (beta + d)
+    exp_dT = np.exp(-d * T)
+    C = r * iu * T + kappa * theta / sigma**2 * ((beta - d) * T - 2 * np.log((1 - g * exp_dT) / (1 - g)))
+    D = (beta - d) / sigma**2 * (1 - exp_dT) / (1 - g * exp_dT)
+    return np.exp(C + D * v0 + iu * np.log(S))
+
+
+@functools.lru_cache(maxsize=8)
+def _legendre_grid(n_points):
+    # Gauss-Legendre nodes cost an eigenvalue solve, so they are computed once per size
+    return np.polynomial.legendre.leggauss(n_points)
+
+
+def heston_analytic(S, K, T, r, v0, kappa, theta, sigma, rho, option_type='call', n_points=256, u_max=None):
+    """
+    Semi-analytic Heston prices for vectors of spots and strikes sharing one maturity.
+
+    The two probabilities P1 and P2 of the Heston formula are integrated with
+    Gauss-Legendre quadrature on [0, u_max]. The spot only enters the characteristic
+    function through exp(i u log S), so it is evaluated once at S = 1 on the quadrature
+    grid and every (S, K) pair only adds a kernel exp(i u log(S / K)).
+
+    The integrand decays roughly like exp(-u^2 w / 2), with w the expected integrated
+    variance to T, so by default u_max grows like 1 / sqrt(w) for short maturities. The
+    node count grows with u_max times the largest |log(K / F)|, so the oscillation of
+    far-from-the-money strikes over the wider domain stays resolved.
+
+    Parameters:
+    - S (float or array_like): Spot price(s)
+    - K (float or array_like): Strike price(s)
+    - T, r, v0, kappa, theta, sigma, rho: Heston model inputs (see heston_model)
+    - option_type (str or array_like): 'call'/'put', or a boolean array (True for calls)
+    - n_points (int): Minimum number of quadrature nodes
+    - u_max (float): Upper truncation of the integration domain (default: adaptive, at least 200)
+
+    Returns:
+    - float or numpy.ndarray: Option price(s) with the broadcast shape of S, K and option_type
+    """
+    S, K, is_call = np.broadcast_arrays(np.asarray(S, dtype=float), np.asarray(K, dtype=float),
+                                        to_call_flag(option_type))
+    shape = S.shape
+    S, K, is_call = S.ravel(), K.ravel(), is_call.ravel()
+    log_moneyness = np.log(S / K)
+    if u_max is None:
+        integrated_variance = theta * T + (v0 - theta) * -np.expm1(-kappa * T) / kappa
+        u_max = max(200.0, 15 / np.sqrt(max(integrated_variance, 1e-12)))
+        # Round up to a multiple of 256 so the cached Legendre grids get reused
+        needed = max(n_points, 0.5 * u_max * np.abs(log_moneyness + r * T).max())
+        n_points = int(min(256 * np.ceil(needed / 256), MAX_QUADRATURE_POINTS))
+    nodes, weights = _legendre_grid(n_points)
+    u = 0.5 * u_max * (nodes + 1)
+    weights = 0.5 * u_max * weights
+
+    discount = np.exp(-r * T)
+    phi_2 = heston_characteristic_function(u, 1.0, T, r, v0, kappa, theta, sigma, rho)
+    phi_1 = heston_characteristic_function(u - 1j, 1.0, T, r, v0, kappa, theta, sigma, rho) * discount
+
+    kernel = np.exp(1j * np.outer(log_moneyness, u)) / (1j * u)
+    P1 = 0.5 + (kernel * phi_1).real @ weights / np.pi
+    P2 = 0.5 + (kernel * phi_2).real @ weights / np.pi
+
+    call = S * P1 - K * discount * P2
+    price = np.where(is_call, call, call - S + K * discount)
+    # Quadrature noise can push deep out-of-the-money prices a hair below zero
+    return np.maximum(price, 0).reshape(shape)
+
+
+def _heston_samples(S, K, T, r, v0, kappa, theta, sigma, rho, option_type, n_steps, scheme, sampling,
+                    control_vol, n_simulations, rng):
+    """
+    Simulate one batch of Heston paths.
+
+    Returns the effective discounted payoff samples and, if control_vol is set, the matching
+    discounted payoffs of a Black-Scholes option with volatility control_vol driven by the
+    same stock-price shocks.
+    """
+    if n_steps is None:
+        n_steps = max(int(T * 252), 1)
+    normals = normal_stream(n_steps, 2, n_simulations, rng, sampling)
+
+    # Accumulate the stock-price shocks on the way through for the control variate
+    shock_sum = np.zeros(n_simulations)
+    def tracked(normals):
+        for Z in normals:
+            np.add(shock_sum, Z[0], out=shock_sum)
+            yield Z
+
+    for log_S_T, _ in generate_heston_paths(S, T, r, v0, kappa, theta, sigma, rho, n_simulations,
+                                             n_steps, scheme, normals=tracked(normals)):
+        pass
+    S_T = np.exp(log_S_T)
+    sign = 1 if option_type == 'call' else -1
+    discount = np.exp(-r * T)
+    samples = effective_samples(discount * np.maximum(sign * (S_T - K), 0), sampling)
+    if control_vol is None:
+        return samples, None
+
+    control_S_T = S * np.exp((r - 0.5 * control_vol**2) * T + control_vol * np.sqrt(T / n_steps) * shock_sum)
+    controls = effective_samples(discount * np.maximum(sign * (control_S_T - K), 0), sampling)
+    return samples, controls
+
+
+def heston_model(S, K, T, r, v0, kappa, theta, sigma, rho, option_type='call', n_simulations=10000,
+                 n_steps=None, scheme='euler', rng=None, method='mc', workers=None, variance_reduction=None):
+    """
+    Heston Model for option pricing using Monte Carlo simulation or the semi-analytic formula.
 
     Parameters:
     - S (float): Initial stock price
@@ -17,86 +216,128 @@ def heston_model(S, K, T, r, v0, kappa, theta, sigma, rho, option_type='call', n
     - rho (float): Correlation between the stock price and its variance
     - option_type (str): 'call' or 'put'
     - n_simulations (int): Number of Monte Carlo simulations
+    - n_steps (int): Number of time steps (defaults to 252 per year)
+    - scheme (str): 'euler' (full-truncation Euler) or 'qe' (quadratic-exponential)
+    - rng (numpy.random.Generator or int): Random generator or seed
+    - method (str): 'mc' (Monte Carlo) or 'analytic' (characteristic-function integration;
+      K may then be a vector of strikes)
+    - workers (int): If set, simulate in chunks with per-chunk random streams on this many
+      processes; results then do not depend on the number of workers
+    - variance_reduction (str or sequence): 'antithetic', 'moment_matching' or 'sobol'
+      (Sobol points with Brownian-bridge construction), optionally combined with
+      'control_variate' (a Black-Scholes option on the same shocks, priced analytically)
 
     Returns:
-    - float: Estimated option price
+    - tuple: (estimated option price, standard error of the estimate; zero for 'analytic')
     """
-    dt = T / 252  # Daily time step
-    n_steps = int(T * 252)
-    prices = np.zeros(n_simulations)
+    if method not in HESTON_METHODS:
+        raise ValueError(f"Unknown method: {method}")
+    if method == 'analytic':
+        price = heston_analytic(S, K, T, r, v0, kappa, theta, sigma, rho, option_type)
+        return price, np.zeros_like(price)
 
-    for i in range(n_simulations):
-        # Initialize stock price and variance
-        St = S
-        vt = v0
+    sampling, use_control = parse_variance_reduction(variance_reduction)
+    control_vol = control_mean = None
+    if use_control:
+        # Control volatility: square root of the expected average variance over [0, T]
+        control_vol = np.sqrt(theta + (v0 - theta) * (1 - np.exp(-kappa * T)) / (kappa * T))
+        control_mean = calculate_black_scholes(S, K, T, r, control_vol, option_type)
 
-        for _ in range(n_steps):
-            # Generate correlated Brownian motions
-            dW1 = np.random.normal(0, np.sqrt(dt))
-            dW2 = rho * dW1 + np.sqrt(1 - rho**2) * np.random.normal(0, np.sqrt(dt))
+    args = (S, K, T, r, v0, kappa, theta, sigma, rho, option_type, n_steps, scheme, sampling, control_vol)
+    if workers is not None:
+        batches = map_simulation_chunks(_heston_samples, n_simulations, rng, workers, args=args)
+    elif sampling == 'sobol':
+        # Independent scramblings give the randomized QMC standard error
+        sizes = split_simulations(n_simulations, -(-n_simulations // ERROR_BATCHES))
+        rngs = np.random.default_rng(rng).spawn(len(sizes))
+        batches = [_heston_samples(*args, size, child) for size, child in zip(sizes, rngs)]
+    else:
+        batches = [_heston_samples(*args, n_simulations, rng)]
+    return combine_estimates(batches, control_mean, batch_errors=sampling == 'sobol')
 
-            # Update variance using the CIR process
-            vt = max(vt + kappa * (theta - vt) * dt + sigma * np.sqrt(max(vt, 0)) * dW2, 0)
 
-            # Update stock price
-            St *= np.exp((r - 0.5 * vt) * dt + np.sqrt(vt) * dW1)
+def sabr_implied_vol(F, K, T, alpha, beta, rho, nu):
+    """
+    Hagan et al. (2002) lognormal implied volatility under SABR, including the time-correction term.
 
-        # Calculate payoff
-        if option_type == 'call':
-            prices[i] = max(St - K, 0)
-        elif option_type == 'put':
-            prices[i] = max(K - St, 0)
+    All inputs broadcast, so a whole smile (or strike/expiry grid) is evaluated in one call.
+    The ATM limit is handled by a series expansion of z / x(z), without branching on F == K.
 
-    # Discount the average payoff to present value
-    return np.exp(-r * T) * np.mean(prices)
+    Parameters:
+    - F (array_like): Forward price(s)
+    - K (array_like): Strike price(s)
+    - T (array_like): Time(s) to maturity (in years)
+    - alpha (float): Initial volatility level
+    - beta (float): Elasticity parameter (0 for normal, 1 for log-normal)
+    - rho (float): Correlation between the underlying asset and its volatility
+    - nu (float): Volatility of the volatility
+
+    Returns:
+    - numpy.ndarray: Black implied volatilities
+    """
+    F = np.asarray(F, dtype=float)
+    K = np.asarray(K, dtype=float)
+    T = np.asarray(T, dtype=float)
+    one_minus_beta = 1 - beta
+    log_FK = np.log(F / K)
+    FK_power = (F * K) ** (one_minus_beta / 2)
+
+    z = nu / alpha * FK_power * log_FK
+    small_z = np.abs(z) < 1e-6
+    safe_z = np.where(small_z, 1.0, z)
+    x_z = np.log((np.sqrt(1 - 2 * rho * safe_z + safe_z**2) + safe_z - rho) / (1 - rho))
+    z_over_x = np.where(small_z, 1 - 0.5 * rho * z + (2 - 3 * rho**2) * z**2 / 12, safe_z / x_z)
+
+    denominator = FK_power * (1 + one_minus_beta**2 / 24 * log_FK**2 + one_minus_beta**4 / 1920 * log_FK**4)
+    time_correction = 1 + (
+        one_minus_beta**2 * alpha**2 / (24 * FK_power**2)
+        + rho * beta * nu * alpha / (4 * FK_power)
+        + (2 - 3 * rho**2) * nu**2 / 24
+    ) * T
+    return alpha / denominator * z_over_x * time_correction
 
 
-def sabr_model(S, K, T, alpha, beta, rho, nu, option_type='call'):
+def sabr_model(S, K, T, alpha, beta, rho, nu, option_type='call', r=0.0):
     """
-    SABR Model for implied volatility calculation.
+    SABR Model for option pricing via the Hagan implied volatility.
 
     Parameters:
-    - S (float): Underlying asset price
-    - K (float): Strike price
-    - T (float): Time to maturity (in years)
-    - alpha (float): Volatility of volatility
-    - beta (float): Elasticity parameter (0 for log-normal, 1 for normal)
+    - S (float or array_like): Underlying asset price(s)
+    - K (float or array_like): Strike price(s)
+    - T (float or array_like): Time(s) to maturity (in years)
+    - alpha (float): Initial volatility level
+    - beta (float): Elasticity parameter (0 for normal, 1 for log-normal)
     - rho (float): Correlation between the underlying asset and its volatility
     - nu (float): Volatility of the volatility
-    - option_type (str): 'call' or 'put'
+    - option_type (str or array_like): 'call'/'put', or a boolean array (True for calls)
+    - r (float or array_like): Risk-free interest rate
 
     Returns:
-    - float: Estimated option price using SABR implied volatility
+    - float or numpy.ndarray: Estimated option price(s) using SABR implied volatility
     """
-    F = S  # Forward price
-    if F == K:
-        sigma = alpha / (F ** (1 - beta))  # ATM case
-    else:
-        z = (nu / alpha) * (F ** (1 - beta) - K ** (1 - beta)) / (1 - beta)
-        x_z = np.log((np.sqrt(1 - 2 * rho * z + z**2) + z - rho) / (1 - rho))
-        sigma = alpha * z / x_z / (F ** (1 - beta))
+    F = np.asarray(S, dtype=float) * np.exp(np.asarray(r, dtype=float) * np.asarray(T, dtype=float))  # Forward price
+    sigma = sabr_implied_vol(F, K, T, alpha, beta, rho, nu)
 
-    # Black-Scholes formula for final pricing
-    d1 = (np.log(S / K) + (0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-
-    if option_type == 'call':
-        return S * norm.cdf(d1) - K * np.exp(-0.5 * T) * norm.cdf(d2)
-    else:
-        return K * np.exp(-0.5 * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
+    # Black's formula on the forward equals Black-Scholes on the spot
+    return calculate_black_scholes_batch(S, K, T, r, sigma, option_type)
 
 
 # Example usage
 if __name__ == "__main__":
     # Heston Model Example
-    heston_price = heston_model(
+    heston_price, heston_stderr = heston_model(
         S=100, K=100, T=1, r=0.05, v0=0.04, kappa=2.0,
         theta=0.04, sigma=0.2, rho=-0.7, option_type='call'
     )
-    print(f"Heston Model Option Price: {heston_price:.2f}")
+    print(f"Heston Model Option Price: {heston_price:.2f} (std. error {heston_stderr:.3f})")
+    heston_analytic_price, _ = heston_model(
+        S=100, K=100, T=1, r=0.05, v0=0.04, kappa=2.0,
+        theta=0.04, sigma=0.2, rho=-0.7, option_type='call', method='analytic'
+    )
+    print(f"Heston Model Analytic Price: {heston_analytic_price:.2f}")
 
     # SABR Model Example
     sabr_price = sabr_model(
-        S=100, K=100, T=1, alpha=0.2, beta=0.5, rho=-0.3, nu=0.4, option_type='call'
+        S=100, K=100, T=1, alpha=0.2, beta=0.5, rho=-0.3, nu=0.4, option_type='call', r=0.05
     )
     print(f"SABR Model Option Price: {sabr_price:.2f}")
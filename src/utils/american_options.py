@@ -0,0 +1,218 @@
+import numpy as np
+from .black_scholes import EPSILON, calculate_black_scholes_batch, to_call_flag
+from .advanced_models import generate_heston_paths
+
+EXERCISE_STYLES = ('european', 'american', 'bermudan')
+LATTICE_METHODS = ('binomial', 'trinomial')
+
+
+def _exercise_layers(exercise, exercise_times, T, n_steps):
+    """
+    Boolean (n_contracts, n_steps + 1) mask of the time layers where early exercise is allowed.
+
+    Bermudan exercise times (in years from today) are snapped to the nearest layer of
+    every contract's own time grid; times past a contract's maturity are ignored.
+    """
+    if exercise not in EXERCISE_STYLES:
+        raise ValueError(f"Unknown exercise style: {exercise}")
+    allowed = np.full((T.size, n_steps + 1), exercise == 'american')
+    if exercise == 'bermudan':
+        times = np.asarray(exercise_times if exercise_times is not None else [], dtype=float)
+        layers = np.rint(times[None, :] / T[:, None] * n_steps).astype(int)
+        rows, columns = np.nonzero((times[None, :] > 0) & (layers <= n_steps))
+        allowed[rows, layers[rows, columns]] = True
+    return allowed
+
+
+def _lattice_prices(S, K, T, r, sigma, sign, q, n_steps, method, allowed):
+    """
+    Backward induction on a recombining lattice for a batch of contracts on one underlying.
+
+    Only one layer of node values per contract is alive at a time, and each layer is
+    updated for every contract and node with a few array operations. The last step uses
+    Black-Scholes values instead of the payoff (Broadie-Detemple smoothing), which
+    removes the odd/even oscillation and makes Richardson extrapolation effective.
+    """
+    K, T, sigma, sign = (x[:, None] for x in (K, T, sigma, sign))
+    dt = T / n_steps
+    discount = np.exp(-r * dt)
+    if method == 'binomial':
+        # Cox-Ross-Rubinstein: layer i has i + 1 nodes at log-spot offsets (2j - i) dx
+        dx = sigma * np.sqrt(dt)
+        p_up = (np.exp((r - q) * dt) - np.exp(-dx)) / (np.exp(dx) - np.exp(-dx))
+        probabilities = (1 - p_up, p_up)
+        node_offsets = lambda i: 2 * np.arange(i + 1) - i
+    else:
+        # Hull's trinomial tree: layer i has 2i + 1 nodes at log-spot offsets (k - i) dx
+        dx = sigma * np.sqrt(3 * dt)
+        drift = (r - q - 0.5 * sigma**2) * np.sqrt(dt / (12 * sigma**2))
+        probabilities = (1 / 6 - drift, 2 / 3, 1 / 6 + drift)
+        node_offsets = lambda i: np.arange(2 * i + 1) - i
+
+    def payoff(i):
+        return np.maximum(sign * (S * np.exp(dx * node_offsets(i)) - K), 0)
+
+    # Layer n_steps - 1: European values over the final step, then the exercise check
+    i = n_steps - 1
+    spots = S * np.exp(dx * node_offsets(i))
+    values = calculate_black_scholes_batch(spots * np.exp(-q * dt), K, dt, r, sigma, sign > 0)
+    values = np.where(allowed[:, i:i + 1], np.maximum(values, payoff(i)), values)
+
+    for i in range(n_steps - 2, -1, -1):
+        n_nodes = node_offsets(i).size
+        continuation = sum(p * values[:, k:k + n_nodes] for k, p in enumerate(probabilities))
+        values = discount * continuation
+        if allowed[:, i].any():
+            values = np.where(allowed[:, i:i + 1], np.maximum(values, payoff(i)), values)
+    return values[:, 0]
+
+
+def lattice_price(S, K, T, r, sigma, option_type='put', exercise='american', exercise_times=None, q=0.0,
+                  n_steps=200, method='binomial', richardson=True):
+    """
+    Price American, Bermudan or European options on one underlying with a binomial or trinomial lattice.
+
+    Contracts are priced together: K, T, sigma and option_type broadcast against each
+    other and every contract gets its own n_steps-step tree. Memory is O(n_steps) per
+    contract since only the current layer of node values is kept.
+
+    Parameters:
+    - S (float): Spot price of the shared underlying
+    - K (array_like): Strike price(s)
+    - T (array_like): Time(s) to maturity (in years)
+    - r (float): Risk-free interest rate
+    - sigma (array_like): Volatility(ies)
+    - option_type (str or array_like): 'call'/'put' per contract, or a boolean array (True for calls)
+    - exercise (str): 'american', 'bermudan' or 'european'
+    - exercise_times (array_like): Bermudan exercise times (in years from today)
+    - q (float): Continuous dividend yield
+    - n_steps (int): Time steps per tree
+    - method (str): 'binomial' (Cox-Ross-Rubinstein) or 'trinomial'
+    - richardson (bool): Extrapolate 2 * P(n_steps) - P(n_steps / 2)
+
+    Returns:
+    - float or numpy.ndarray: Option price(s) with the broadcast shape of the inputs
+    """
+    if method not in LATTICE_METHODS:
+        raise ValueError(f"Unknown lattice method: {method}")
+    is_call = to_call_flag(option_type)
+    K, T, sigma, is_call = np.broadcast_arrays(np.asarray(K, dtype=float), np.asarray(T, dtype=float),
+                                               np.asarray(sigma, dtype=float), is_call)
+    shape = K.shape
+    K, sigma = np.maximum(K.ravel(), EPSILON), np.maximum(sigma.ravel(), EPSILON)
+    T = np.maximum(T.ravel(), EPSILON)
+    sign = np.where(is_call.ravel(), 1.0, -1.0)
+
+    def price(steps):
+        allowed = _exercise_layers(exercise, exercise_times, T, steps)
+        return _lattice_prices(max(S, EPSILON), K, T, r, sigma, sign, q, steps, method, allowed)
+
+    prices = price(n_steps)
+    if richardson and n_steps >= 4:
+        prices = 2 * prices - price(n_steps // 2)
+    return prices.reshape(shape)
+
+
+def _lsm_basis(x, v):
+    # Polynomials in moneyness plus the variance level, which is observable under Heston
+    return np.stack([np.ones_like(x), x, x**2, x**3, v, v**2, x * v], axis=-1)
+
+
+def lsm_heston(S, K, T, r, v0, kappa, theta, sigma, rho, option_type='put', exercise='american',
+               exercise_times=None, n_simulations=20000, n_steps=None, scheme='euler', rng=None):
+    """
+    Longstaff-Schwartz Monte Carlo for American and Bermudan options under Heston.
+
+    Paths come from generate_heston_paths; spot and variance are kept only at the
+    exercise dates, so memory is n_exercise_dates x n_simulations. Every strike shares
+    the same paths, and at each exercise date the continuation regressions of all
+    strikes are solved together as one batch of small normal-equation systems over
+    their in-the-money paths.
+
+    Parameters:
+    - S, T, r, v0, kappa, theta, sigma, rho: Heston model inputs (see heston_model)
+    - K (float or array_like): Strike price(s) sharing the maturity T
+    - option_type (str or array_like): 'call'/'put' per strike, or a boolean array (True for calls)
+    - exercise (str): 'american' (every time step) or 'bermudan'
+    - exercise_times (array_like): Bermudan exercise times (in years from today)
+    - n_simulations (int): Number of paths
+    - n_steps (int): Number of time steps (defaults to 252 per year)
+    - scheme (str): 'euler' or 'qe'
+    - rng (numpy.random.Generator or int): Random generator or seed
+
+    Returns:
+    - tuple: (price(s), standard error(s)) with the broadcast shape of K and option_type
+    """
+    if exercise not in ('american', 'bermudan'):
+        raise ValueError(f"Unknown exercise style for LSM: {exercise}")
+    if n_steps is None:
+        n_steps = max(int(T * 252), 1)
+    dt = T / n_steps
+
+    K, is_call = np.broadcast_arrays(np.asarray(K, dtype=float), to_call_flag(option_type))
+    shape = K.shape
+    K = K.ravel()[:, None]
+    sign = np.where(is_call.ravel(), 1.0, -1.0)[:, None]
+
+    if exercise == 'american':
+        steps = np.arange(1, n_steps + 1)
+    else:
+        times = np.asarray(exercise_times if exercise_times is not None else [], dtype=float)
+        steps = np.unique(np.clip(np.rint(times / dt).astype(int), 1, n_steps))
+        steps = np.union1d(steps, [n_steps])
+    step_index = np.full(n_steps + 1, -1)
+    step_index[steps] = np.arange(steps.size)
+
+    spots = np.empty((steps.size, n_simulations))
+    variances = np.empty((steps.size, n_simulations))
+    paths = generate_heston_paths(S, T, r, v0, kappa, theta, sigma, rho, n_simulations, n_steps, scheme, rng)
+    for step, (log_S, v) in enumerate(paths, start=1):
+        if step_index[step] >= 0:
+            spots[step_index[step]] = np.exp(log_S)
+            variances[step_index[step]] = np.maximum(v, 0)
+
+    # Cash flows of every strike and path, valued at the current exercise date
+    cash_flows = np.maximum(sign * (spots[-1] - K), 0)
+    for k in range(steps.size - 2, -1, -1):
+        cash_flows *= np.exp(-r * (steps[k + 1] - steps[k]) * dt)
+        exercise_value = np.maximum(sign * (spots[k] - K), 0)
+        in_the_money = (exercise_value > 0).astype(float)
+
+        X = _lsm_basis(spots[k] / S, variances[k] / max(theta, EPSILON))
+        weighted = in_the_money[:, :, None] * X
+        A = weighted.transpose(0, 2, 1) @ X
+        b = np.einsum('cpi,cp->ci', weighted, cash_flows, optimize=True)
+        # A small ridge keeps strikes with few in-the-money paths solvable
+        A += 1e-10 * np.trace(A, axis1=1, axis2=2)[:, None, None] * np.eye(X.shape[1]) + 1e-12 * np.eye(X.shape[1])
+        continuation = np.linalg.solve(A, b[..., None])[..., 0] @ X.T
+
+        exercise_now = (in_the_money > 0) & (exercise_value > continuation)
+        cash_flows = np.where(exercise_now, exercise_value, cash_flows)
+
+    samples = cash_flows * np.exp(-r * steps[0] * dt)
+    price = samples.mean(axis=1)
+    std_error = samples.std(axis=1, ddof=1) / np.sqrt(n_simulations)
+    # Exercising immediately is always an option for American contracts
+    if exercise == 'american':
+        price = np.maximum(price, np.maximum(sign[:, 0] * (S - K[:, 0]), 0))
+    return price.reshape(shape), std_error.reshape(shape)
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    strikes = np.linspace(80, 120, 41)
+    for method in LATTICE_METHODS:
+        start = time.perf_counter()
+        prices = lattice_price(100, strikes, 1.0, 0.05, 0.2, 'put', method=method)
+        elapsed = time.perf_counter() - start
+        print(f"{method.capitalize()} American puts: K=100 {prices[20]:.4f} "
+              f"({strikes.size} strikes in {elapsed * 1e3:.1f} ms)")
+    print(f"Bermudan put (quarterly): {lattice_price(100, 100, 1.0, 0.05, 0.2, 'put', 'bermudan', [0.25, 0.5, 0.75]):.4f}")
+    print(f"European put: {lattice_price(100, 100, 1.0, 0.05, 0.2, 'put', 'european'):.4f}")
+
+    start = time.perf_counter()
+    prices, errors = lsm_heston(100, strikes[::10], 1.0, 0.05, 0.04, 2.0, 0.04, 0.3, -0.7, 'put', rng=0)
+    elapsed = time.perf_counter() - start
+    print(f"Heston LSM American puts: {np.round(prices, 4)} (std. errors {np.round(errors, 4)}, {elapsed:.2f}s)")
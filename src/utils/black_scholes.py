@@ -1,22 +1,116 @@
 import numpy as np
-from scipy.stats import norm
+from scipy.special import ndtr
+
+EPSILON = 1e-10  # Small value to prevent division by zero
+
+
+def resolve_sigma(sigma, K, T):
+    """
+    Evaluate a volatility surface (any object with an implied_vol(K, T) method) at the
+    contracts' strikes and expiries; a plain sigma is returned unchanged.
+    """
+    if hasattr(sigma, 'implied_vol'):
+        return sigma.implied_vol(K, T)
+    return sigma
+
 
 def calculate_black_scholes(S, K, T, r, sigma, option_type='call'):
     """
     Calculate Black-Scholes option price
     """
-    epsilon = 1e-10  # Small value to prevent division by zero
-    S = max(S, epsilon)
-    K = max(K, epsilon)
-    T = max(T, epsilon)
-    sigma = max(sigma, epsilon)
+    sigma = float(resolve_sigma(sigma, K, T))
+    S = max(S, EPSILON)
+    K = max(K, EPSILON)
+    T = max(T, EPSILON)
+    sigma = max(sigma, EPSILON)
 
     d1 = (np.log(S / K) + (r + sigma**2 / 2) * T) / (sigma * np.sqrt(T))
     d2 = d1 - sigma * np.sqrt(T)
 
     if option_type == 'call':
-        option_price = S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2)
+        option_price = S * ndtr(d1) - K * np.exp(-r * T) * ndtr(d2)
     else:
-        option_price = K * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
+        option_price = K * np.exp(-r * T) * ndtr(-d2) - S * ndtr(-d1)
 
     return option_price
+
+
+def to_call_flag(option_type):
+    """
+    Convert an option type (a 'call'/'put' string, a sequence of them, or booleans)
+    into a boolean array that is True for calls.
+    """
+    flags = np.asarray(option_type)
+    if flags.dtype == bool:
+        return flags
+    if flags.dtype.kind in "iuf":
+        return flags.astype(bool)
+    return np.char.lower(flags.astype(str)) == 'call'
+
+
+def calculate_black_scholes_batch(S, K, T, r, sigma, option_type='call'):
+    """
+    Calculate Black-Scholes prices for whole arrays of contracts in one pass.
+
+    All inputs are broadcast against each other, so a chain can be priced with
+    per-row arrays, or a grid with e.g. S[None, :] and sigma[:, None]. Inputs are
+    clamped with the same epsilon as calculate_black_scholes.
+
+    Parameters:
+    - S (array_like): Stock prices
+    - K (array_like): Strike prices
+    - T (array_like): Times to maturity (in years)
+    - r (array_like): Risk-free interest rates
+    - sigma (array_like or VolatilitySurface): Volatilities, or a surface evaluated at each (K, T)
+    - option_type (str or array_like): 'call'/'put' per row, or a boolean array (True for calls)
+
+    Returns:
+    - numpy.ndarray: Option prices with the broadcast shape of the inputs
+    """
+    sigma = resolve_sigma(sigma, K, T)
+    S = np.maximum(np.asarray(S, dtype=float), EPSILON)
+    K = np.maximum(np.asarray(K, dtype=float), EPSILON)
+    T = np.maximum(np.asarray(T, dtype=float), EPSILON)
+    sigma = np.maximum(np.asarray(sigma, dtype=float), EPSILON)
+    r = np.asarray(r, dtype=float)
+    is_call = to_call_flag(option_type)
+
+    sqrt_T = np.sqrt(T)
+    sig_sqrt_T = sigma * sqrt_T
+    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / sig_sqrt_T
+    d2 = d1 - sig_sqrt_T
+    discounted_K = K * np.exp(-r * T)
+
+    # Calls and puts share d1/d2; a put is priced from the call with the sign flipped
+    sign = np.where(is_call, 1.0, -1.0)
+    return sign * (S * ndtr(sign * d1) - discounted_K * ndtr(sign * d2))
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    n_contracts = 50_000
+    S = rng.uniform(50, 150, n_contracts)
+    K = rng.uniform(50, 150, n_contracts)
+    T = rng.uniform(0.05, 2.0, n_contracts)
+    r = np.full(n_contracts, 0.05)
+    sigma = rng.uniform(0.1, 0.6, n_contracts)
+    option_types = np.where(rng.random(n_contracts) < 0.5, 'call', 'put')
+
+    n_loop = 5_000
+    start = time.perf_counter()
+    loop_prices = [
+        calculate_black_scholes(S[i], K[i], T[i], r[i], sigma[i], option_types[i])
+        for i in range(n_loop)
+    ]
+    loop_rate = n_loop / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batch_prices = calculate_black_scholes_batch(S, K, T, r, sigma, option_types)
+    batch_rate = n_contracts / (time.perf_counter() - start)
+
+    print(f"Max abs difference vs scalar: {np.max(np.abs(batch_prices[:n_loop] - loop_prices)):.2e}")
+    print(f"Scalar loop: {loop_rate:,.0f} contracts/second")
+    print(f"Batch:       {batch_rate:,.0f} contracts/second ({batch_rate / loop_rate:,.0f}x)")
@@ -0,0 +1,104 @@
+import functools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAXSIZE = 64
+
+_registry = {}
+
+
+def _make_key(value):
+    """
+    Turn an argument into a hashable cache key; NumPy arrays are keyed on their contents.
+    """
+    if isinstance(value, np.ndarray):
+        return ('ndarray', value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return tuple(_make_key(v) for v in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, 'cache_key'):
+        # Mutable inputs such as volatility surfaces are keyed on a snapshot of their state
+        return (type(value).__name__, value.cache_key())
+    return value
+
+
+class LRUCache:
+    """
+    Bounded mapping with least-recently-used eviction and hit/miss counters.
+
+    Streamlit runs every session in its own thread, so the dictionary is only touched
+    under a lock. The lock is not held while a value is computed: two threads missing
+    the same key at once may both compute it, and the last one stored wins.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return self._data[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data), 'maxsize': self.maxsize}
+
+
+def memoize(maxsize=DEFAULT_MAXSIZE, name=None):
+    """
+    Decorator caching a function's results in an LRUCache keyed on its arguments.
+
+    The cache lives at module level, so it is shared process-wide: it survives Streamlit
+    reruns and is shared by every session (each running in its own thread). Cached return
+    values are shared between callers and sessions and must not be modified.
+    """
+    def decorator(func):
+        cache = LRUCache(maxsize)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (_make_key(args), _make_key(tuple(sorted(kwargs.items()))))
+            return cache.get(key, lambda: func(*args, **kwargs))
+
+        wrapper.cache = cache
+        _registry[name or func.__name__] = cache
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """
+    Return hit/miss statistics for every memoized function, keyed by name.
+    """
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+def clear_caches():
+    """
+    Empty every memoized function's cache and reset its counters.
+    """
+    for cache in _registry.values():
+        cache.clear()
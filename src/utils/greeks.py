@@ -1,28 +1,59 @@
 import numpy as np
-from scipy.stats import norm
+from scipy.special import ndtr
+from .black_scholes import EPSILON, resolve_sigma, to_call_flag
 
-def calculate_greeks(S, K, T, r, sigma):
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x**2) / np.sqrt(2 * np.pi)
+
+
+def calculate_greeks(S, K, T, r, sigma, option_type='call'):
     """
-    Calculate option Greeks (Delta, Gamma, Theta, Vega, Rho).
+    Calculate option Greeks for single contracts or whole arrays of contracts.
+
+    Inputs are broadcast against each other and clamped like calculate_black_scholes.
+    d1, d2 and their normal pdf/cdf are evaluated once and shared by every Greek.
 
     Parameters:
-    S: Stock price
-    K: Strike price
-    T: Time to maturity (in years)
-    r: Risk-free interest rate
-    sigma: Volatility
+    S: Stock price(s)
+    K: Strike price(s)
+    T: Time(s) to maturity (in years)
+    r: Risk-free interest rate(s)
+    sigma: Volatility(ies), or a VolatilitySurface evaluated at each (K, T)
+    option_type: 'call'/'put' (per contract if an array), or a boolean array (True for calls)
 
     Returns:
-    Dictionary of Greeks.
+    Dictionary of Greeks: first order (delta, theta, vega, rho), second order
+    (gamma, vanna, volga, charm) and third order (speed). Theta and charm are per year.
     """
-    d1 = (np.log(S / K) + (r + sigma ** 2 / 2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
+    sigma = resolve_sigma(sigma, K, T)
+    S = np.maximum(np.asarray(S, dtype=float), EPSILON)
+    K = np.maximum(np.asarray(K, dtype=float), EPSILON)
+    T = np.maximum(np.asarray(T, dtype=float), EPSILON)
+    sigma = np.maximum(np.asarray(sigma, dtype=float), EPSILON)
+    r = np.asarray(r, dtype=float)
+    sign = np.where(to_call_flag(option_type), 1.0, -1.0)
+
+    sqrt_T = np.sqrt(T)
+    sig_sqrt_T = sigma * sqrt_T
+    d1 = (np.log(S / K) + (r + sigma ** 2 / 2) * T) / sig_sqrt_T
+    d2 = d1 - sig_sqrt_T
+    pdf_d1 = norm_pdf(d1)
+    cdf_d1 = ndtr(sign * d1)
+    cdf_d2 = ndtr(sign * d2)
+    discounted_K = K * np.exp(-r * T)
+
+    gamma = pdf_d1 / (S * sig_sqrt_T)
+    vega = S * sqrt_T * pdf_d1
 
     return {
-        'delta': norm.cdf(d1),
-        'gamma': norm.pdf(d1) / (S * sigma * np.sqrt(T)),
-        'theta': (-S * norm.pdf(d1) * sigma / (2 * np.sqrt(T))
-                  - r * K * np.exp(-r * T) * norm.cdf(d2)),
-        'vega': S * np.sqrt(T) * norm.pdf(d1),
-        'rho': K * T * np.exp(-r * T) * norm.cdf(d2)
+        'delta': sign * cdf_d1,
+        'gamma': gamma,
+        'theta': -S * pdf_d1 * sigma / (2 * sqrt_T) - sign * r * discounted_K * cdf_d2,
+        'vega': vega,
+        'rho': sign * discounted_K * T * cdf_d2,
+        'vanna': -pdf_d1 * d2 / sigma,
+        'volga': vega * d1 * d2 / sigma,
+        'charm': -pdf_d1 * (2 * r * T - d2 * sig_sqrt_T) / (2 * T * sig_sqrt_T),
+        'speed': -gamma / S * (d1 / sig_sqrt_T + 1),
     }
@@ -1,6 +1,14 @@
-import yfinance as yf
+import json
 import os
 
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+STORE_DTYPE = np.dtype([('Date', 'datetime64[D]')] + [(column, 'f8') for column in PRICE_COLUMNS])
+DEFAULT_STORE_PATH = "src/data/store"
+
+
 def fetch_historical_data(ticker="AAPL", start_date="2020-01-01", end_date="2023-01-01", output_path="src/data/historical_data.csv"):
     """
     Fetch historical stock data for the given ticker using yfinance and save it as a CSV file.
@@ -14,20 +22,200 @@ def fetch_historical_data(ticker="AAPL", start_date="2020-01-01", end_date="2023
     Returns:
     - pandas.DataFrame: The fetched historical data.
     """
+    import yfinance as yf
+
     print(f"Fetching historical data for {ticker} from {start_date} to {end_date}...")
-    
+
     # Fetch data using yfinance
     data = yf.download(ticker, start=start_date, end=end_date)
-    
+
     # Ensure the output directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
+
     # Save the data to CSV
     data.to_csv(output_path)
     print(f"Data saved to {output_path}")
-    
+
     return data
 
+
+def _flatten_columns(data):
+    """
+    Drop the ticker level of yfinance's (Price, Ticker) column index.
+    """
+    if isinstance(data.columns, pd.MultiIndex):
+        data = data.copy()
+        data.columns = data.columns.get_level_values(0)
+    return data
+
+
+class YFinanceSource:
+    """
+    Data source downloading daily OHLCV bars from Yahoo Finance.
+    """
+
+    def fetch(self, ticker, start, end):
+        import yfinance as yf
+        data = yf.download(ticker, start=str(start), end=str(end), progress=False, auto_adjust=True)
+        return _flatten_columns(data)
+
+
+class CSVSource:
+    """
+    Offline data source serving bars from a yfinance CSV dump (e.g. src/data/historical_data.csv).
+
+    Useful as a local stand-in for the network when testing or working offline.
+    """
+
+    def __init__(self, path="src/data/historical_data.csv"):
+        self.path = path
+        self._data = None
+
+    def fetch(self, ticker, start, end):
+        if self._data is None:
+            self._data = _flatten_columns(
+                pd.read_csv(self.path, header=[0, 1], skiprows=[2], index_col=0, parse_dates=True)
+            )
+        dates = self._data.index.values.astype('datetime64[D]')
+        rows = (dates >= np.datetime64(start, 'D')) & (dates < np.datetime64(end, 'D'))
+        return self._data[rows]
+
+
+class HistoricalDataStore:
+    """
+    Local columnar store of daily bars with incremental refresh.
+
+    Every ticker lives in a NumPy structured array file (TICKER.npy) sorted by date,
+    next to a small JSON file recording the contiguous date range already fetched.
+    Reads memory-map the file and binary-search the date column, so serving a slice
+    does not read the whole history. Refreshing fetches only the dates outside the
+    recorded range from the pluggable source, which only needs a
+    fetch(ticker, start, end) method returning a DataFrame of OHLCV bars indexed by date.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, source=None):
+        self.path = path
+        self.source = source if source is not None else YFinanceSource()
+
+    def _files(self, ticker):
+        name = ticker.upper()
+        return os.path.join(self.path, f"{name}.npy"), os.path.join(self.path, f"{name}.json")
+
+    def coverage(self, ticker):
+        """
+        Return the (start, end) date range already fetched for ticker, end exclusive, or None.
+        """
+        _, meta_file = self._files(ticker)
+        if not os.path.exists(meta_file):
+            return None
+        with open(meta_file) as f:
+            meta = json.load(f)
+        return np.datetime64(meta['start'], 'D'), np.datetime64(meta['end'], 'D')
+
+    def load(self, ticker):
+        """
+        Memory-map every stored bar for ticker as a structured array (empty if none).
+        """
+        data_file, _ = self._files(ticker)
+        if not os.path.exists(data_file):
+            return np.empty(0, dtype=STORE_DTYPE)
+        return np.load(data_file, mmap_mode='r')
+
+    def missing_ranges(self, ticker, start, end):
+        """
+        Date ranges in [start, end) that have not been fetched yet.
+        """
+        start, end = np.datetime64(start, 'D'), np.datetime64(end, 'D')
+        covered = self.coverage(ticker)
+        if covered is None:
+            return [(start, end)]
+        covered_start, covered_end = covered
+        # Coverage is kept contiguous, so a request beyond it also fetches the gap in between
+        ranges = []
+        if start < covered_start:
+            ranges.append((start, covered_start))
+        if end > covered_end:
+            ranges.append((covered_end, end))
+        return ranges
+
+    def refresh(self, ticker, start, end):
+        """
+        Fetch whatever part of [start, end) is missing and merge it into the store.
+
+        Only ranges that returned bars extend the recorded coverage, so empty or failed
+        fetches are retried on the next call.
+
+        Returns:
+        - int: Number of new bars stored
+        """
+        ranges = self.missing_ranges(ticker, start, end)
+        if not ranges:
+            return 0
+
+        covered = self.coverage(ticker)
+        starts, ends = ([covered[0]], [covered[1]]) if covered else ([], [])
+        fetched = []
+        today = np.datetime64('today', 'D')
+        for range_start, range_end in ranges:
+            records = self._to_records(_flatten_columns(self.source.fetch(ticker, range_start, range_end)))
+            # An empty result (failed download, future dates) must not mark the range as fetched,
+            # and coverage never extends past today or the last bar actually returned
+            if len(records):
+                fetched.append(records)
+                starts.append(range_start)
+                ends.append(min(range_end, today, records['Date'].max() + 1))
+        if not fetched:
+            return 0
+        new_bars = np.concatenate(fetched)
+
+        existing = np.asarray(self.load(ticker))
+        bars = np.concatenate([existing, new_bars])
+        bars = bars[np.argsort(bars['Date'], kind='stable')]
+        # The stable sort puts re-fetched bars after the stored ones, so keeping the last bar of a date replaces them
+        keep = np.ones(len(bars), dtype=bool)
+        keep[:-1] = bars['Date'][:-1] != bars['Date'][1:]
+        bars = bars[keep]
+
+        self._write(ticker, bars, min(starts), max(ends))
+        return len(bars) - len(existing)
+
+    def get(self, ticker, start, end, refresh=True):
+        """
+        Return the bars for ticker with start <= date < end, fetching missing dates first.
+
+        Returns:
+        - pandas.DataFrame: Open, High, Low, Close and Volume indexed by Date
+        """
+        if refresh:
+            self.refresh(ticker, start, end)
+        bars = self.load(ticker)
+        dates = bars['Date']
+        lo, hi = np.searchsorted(dates, [np.datetime64(start, 'D'), np.datetime64(end, 'D')])
+        window = np.asarray(bars[lo:hi])
+        return pd.DataFrame(
+            {column: window[column] for column in PRICE_COLUMNS},
+            index=pd.DatetimeIndex(window['Date'], name='Date'),
+        )
+
+    @staticmethod
+    def _to_records(frame):
+        records = np.empty(len(frame), dtype=STORE_DTYPE)
+        records['Date'] = pd.DatetimeIndex(frame.index).values.astype('datetime64[D]')
+        for column in PRICE_COLUMNS:
+            records[column] = frame[column].to_numpy(dtype=float) if column in frame else np.nan
+        return records
+
+    def _write(self, ticker, bars, start, end):
+        data_file, meta_file = self._files(ticker)
+        os.makedirs(self.path, exist_ok=True)
+        # Write to a temporary file first so readers never see a half-written store
+        temp_file = data_file + ".tmp.npy"
+        np.save(temp_file, bars)
+        os.replace(temp_file, data_file)
+        with open(meta_file, "w") as f:
+            json.dump({'start': str(start), 'end': str(end)}, f)
+
+
 # Example usage
 if __name__ == "__main__":
     fetch_historical_data(ticker="AAPL", start_date="2020-01-01", end_date="2023-01-01")
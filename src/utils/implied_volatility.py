@@ -0,0 +1,157 @@
+import numpy as np
+from .black_scholes import calculate_black_scholes_batch, to_call_flag
+from .greeks import calculate_greeks
+
+MIN_VOL = 1e-6
+MAX_VOL = 10.0
+
+
+def price_bounds(S, K, T, r, option_type='call'):
+    """
+    No-arbitrage bounds on European option prices.
+
+    Returns:
+    - tuple: (lower bound, upper bound) arrays
+    """
+    S, K, T, r = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (S, K, T, r)))
+    is_call = to_call_flag(option_type)
+    discounted_K = K * np.exp(-r * T)
+    lower = np.where(is_call, np.maximum(S - discounted_K, 0), np.maximum(discounted_K - S, 0))
+    upper = np.where(is_call, S, discounted_K)
+    return lower, upper
+
+
+def initial_guess(call_price, S, K, T, r):
+    """
+    Corrado-Miller rational approximation of the implied volatility from a call price,
+    with the Brenner-Subrahmanyam ATM estimate where the approximation breaks down.
+    """
+    discounted_K = K * np.exp(-r * T)
+    half_moneyness = (S - discounted_K) / 2
+    excess = call_price - half_moneyness
+    radicand = np.maximum(excess**2 - (S - discounted_K)**2 / np.pi, 0)
+    guess = np.sqrt(2 * np.pi / T) / (S + discounted_K) * (excess + np.sqrt(radicand))
+    atm_guess = np.sqrt(2 * np.pi / T) * call_price / S
+    guess = np.where(np.isfinite(guess) & (guess > MIN_VOL), guess, atm_guess)
+    return np.clip(guess, MIN_VOL, MAX_VOL)
+
+
+def _solve_out_of_the_money(target, call_price, S, K, T, r, otm_is_call, tol, max_iter):
+    """
+    Halley iterations with a bisection fallback on one chunk of valid quotes.
+    """
+    implied_vols = np.empty(target.size)
+    active = np.arange(target.size)
+    vol = initial_guess(call_price, S, K, T, r)
+    low = np.full(active.size, MIN_VOL)
+    high = np.full(active.size, MAX_VOL)
+
+    for _ in range(max_iter):
+        diff = calculate_black_scholes_batch(S, K, T, r, vol, otm_is_call) - target
+        done = np.abs(diff) <= tol * target
+        if done.any():
+            implied_vols[active[done]] = vol[done]
+            keep = ~done
+            active, target, S, K, T, r, otm_is_call, vol, low, high, diff = (
+                x[keep] for x in (active, target, S, K, T, r, otm_is_call, vol, low, high, diff)
+            )
+        if not active.size:
+            break
+
+        # Option prices increase with volatility, so the sign of the error tightens the bracket
+        too_high = diff > 0
+        high = np.where(too_high, vol, high)
+        low = np.where(too_high, low, vol)
+
+        greeks = calculate_greeks(S, K, T, r, vol, otm_is_call)
+        vega, volga = greeks['vega'], greeks['volga']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Vega underflows to zero for deep out-of-the-money and near-expiry quotes; the bracket check catches it
+            newton = diff / vega
+            step = newton / (1 - 0.5 * newton * volga / vega)
+        candidate = vol - step
+        in_bracket = np.isfinite(candidate) & (candidate > low) & (candidate < high)
+        vol = np.where(in_bracket, candidate, 0.5 * (low + high))
+
+    # Whatever is left hit max_iter; its bracket is tight enough to report
+    implied_vols[active] = vol
+    return implied_vols
+
+
+def calculate_implied_volatility(price, S, K, T, r, option_type='call', tol=1e-10, max_iter=50,
+                                 chunk_size=131072):
+    """
+    Solve for Black-Scholes implied volatilities of whole arrays of quotes at once.
+
+    Every quote is converted through put-call parity to the out-of-the-money option on
+    the same strike, which keeps the price well conditioned in volatility. It is started
+    from a rational initial guess and refined with vectorized Halley steps. A bisection
+    bracket is kept for every quote: whenever a Halley step leaves the bracket the quote
+    bisects instead. Only quotes that have not converged are iterated on, and quotes are
+    processed in cache-sized chunks.
+
+    Parameters:
+    - price (array_like): Option prices
+    - S (array_like): Stock prices
+    - K (array_like): Strike prices
+    - T (array_like): Times to maturity (in years)
+    - r (array_like): Risk-free interest rates
+    - option_type (str or array_like): 'call'/'put' per quote, or a boolean array (True for calls)
+    - tol (float): Price tolerance, relative to the out-of-the-money price
+    - max_iter (int): Maximum number of iterations
+    - chunk_size (int): Number of quotes solved together
+
+    Returns:
+    - tuple: (implied volatilities, boolean mask of valid quotes). Quotes outside the
+      no-arbitrage bounds are flagged invalid and get NaN instead of raising.
+    """
+    price, S, K, T, r, is_call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (price, S, K, T, r)), to_call_flag(option_type)
+    )
+    shape = price.shape
+    price, S, K, T, r, is_call = (x.ravel() for x in (price, S, K, T, r, is_call))
+
+    lower, upper = price_bounds(S, K, T, r, is_call)
+    valid = (price > lower) & (price < upper) & (T > 0)
+
+    # Solve on the out-of-the-money side: C - P = S - K exp(-rT)
+    parity = S - K * np.exp(-r * T)
+    otm_is_call = parity <= 0
+    call_price = np.where(is_call, price, price + parity)
+    otm_price = np.where(otm_is_call, call_price, call_price - parity)
+
+    implied_vols = np.full(price.shape, np.nan)
+    valid_index = np.flatnonzero(valid)
+    for start in range(0, valid_index.size, chunk_size):
+        chunk = valid_index[start:start + chunk_size]
+        implied_vols[chunk] = _solve_out_of_the_money(
+            otm_price[chunk], call_price[chunk], S[chunk], K[chunk], T[chunk], r[chunk],
+            otm_is_call[chunk], tol, max_iter
+        )
+    return implied_vols.reshape(shape), valid.reshape(shape)
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    n_quotes = 1_000_000
+    S = np.full(n_quotes, 100.0)
+    K = rng.uniform(60, 160, n_quotes)
+    T = rng.uniform(0.05, 3.0, n_quotes)
+    r = np.full(n_quotes, 0.03)
+    true_vols = rng.uniform(0.05, 1.0, n_quotes)
+    option_types = rng.random(n_quotes) < 0.5
+    prices = calculate_black_scholes_batch(S, K, T, r, true_vols, option_types)
+
+    start = time.perf_counter()
+    implied_vols, valid = calculate_implied_volatility(prices, S, K, T, r, option_types)
+    elapsed = time.perf_counter() - start
+
+    # Quotes with negligible vega do not pin down a volatility in double precision
+    informative = valid & (calculate_greeks(S, K, T, r, true_vols, option_types)['vega'] > 1e-4)
+    error = np.abs(implied_vols - true_vols)[informative]
+    print(f"Solved {valid.sum():,} of {n_quotes:,} quotes ({(~valid).sum():,} flagged)")
+    print(f"Max abs vol error (vega > 1e-4): {error.max():.2e}")
+    print(f"Throughput: {n_quotes / elapsed:,.0f} quotes/second")
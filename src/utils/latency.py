@@ -0,0 +1,35 @@
+import numpy as np
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram from 1 microsecond to 100 seconds.
+
+    Recording is a searchsorted and a bincount, so whole batches of samples are added
+    at once; percentiles are read off the bucket upper edges (capped at the maximum seen).
+    """
+
+    def __init__(self, low=1e-6, high=100.0, buckets_per_decade=20):
+        n_buckets = int(round(np.log10(high / low) * buckets_per_decade))
+        self.edges = np.logspace(np.log10(low), np.log10(high), n_buckets + 1)
+        # Bucket 0 holds samples below low, the last bucket samples above high
+        self.counts = np.zeros(n_buckets + 2, dtype=np.int64)
+        self.max = 0.0
+
+    def record(self, seconds):
+        seconds = np.atleast_1d(np.asarray(seconds, dtype=float))
+        if seconds.size:
+            buckets = np.searchsorted(self.edges, seconds, side='right')
+            self.counts += np.bincount(buckets, minlength=self.counts.size)
+            self.max = max(self.max, float(seconds.max()))
+
+    def percentile(self, q):
+        total = self.counts.sum()
+        if not total:
+            return np.nan
+        bucket = np.searchsorted(np.cumsum(self.counts), q / 100 * total)
+        return min(self.edges[min(bucket, self.edges.size - 1)], self.max)
+
+    def summary(self):
+        return {'count': int(self.counts.sum()), 'p50': self.percentile(50), 'p99': self.percentile(99),
+                'max': self.max}
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+from .black_scholes import calculate_black_scholes_batch, to_call_flag
+from .volatility import TRADING_DAYS
+
+POSITION_COLUMNS = ('underlying', 'K', 'T', 'sigma', 'quantity')
+MAX_CHUNK_ELEMENTS = 4_000_000  # Scenario x position values held at once when chunk_size is not given
+
+
+def _prepare_positions(positions, spots, covariance):
+    """
+    Validate the positions table and line it up with the spot vector and covariance matrix.
+    """
+    missing = [column for column in POSITION_COLUMNS if column not in positions.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    spots = pd.Series(spots, dtype=float)
+    covariance = np.asarray(
+        covariance.loc[spots.index, spots.index] if isinstance(covariance, pd.DataFrame) else covariance,
+        dtype=float,
+    )
+    if covariance.shape != (len(spots), len(spots)):
+        raise ValueError(f"Covariance must be {len(spots)}x{len(spots)}, got {covariance.shape}")
+
+    underlying_index = spots.index.get_indexer(positions['underlying'])
+    if (underlying_index < 0).any():
+        unknown = sorted(set(positions['underlying'][underlying_index < 0]))
+        raise ValueError(f"No spot for underlyings: {unknown}")
+    return spots, covariance, underlying_index
+
+
+def simulate_portfolio_risk(positions, spots, covariance, r, confidence_level=0.95, n_simulations=100000,
+                            horizon=1, chunk_size=None, rng=42, periods_per_year=TRADING_DAYS):
+    """
+    Monte Carlo VaR and Expected Shortfall of a book of options on correlated underlyings.
+
+    Horizon log returns are drawn as Z @ L.T, with L the Cholesky factor of the
+    covariance matrix, and every position is repriced under every scenario with one
+    broadcast Black-Scholes call per chunk of scenarios (at its own unchanged sigma,
+    horizon days closer to expiry). Only chunk_size x n_positions values are alive at
+    a time: the portfolio P&L of every scenario is kept, but position-level P&L only for
+    the current worst scenarios needed by the tail allocations. Scenarios are drawn from
+    one sequential stream, so the result does not depend on chunk_size.
+
+    Component VaR is the Euler allocation E[position P&L | portfolio P&L = -VaR],
+    estimated over the scenarios ranked closest to the VaR quantile and scaled to add
+    up to VaR. Component ES is the mean position P&L over the tail and adds up to ES.
+    Marginal VaR is the component VaR per unit of quantity.
+
+    Parameters:
+    - positions (pandas.DataFrame): One row per position with columns underlying, K, T,
+      sigma and quantity, plus an optional option_type column ('call'/'put', defaults to 'call')
+    - spots (dict or pandas.Series): Spot price of every underlying
+    - covariance (array_like or pandas.DataFrame): Annualized covariance of the underlyings'
+      log returns, ordered like spots (or labelled by underlying)
+    - r (float): Risk-free interest rate
+    - confidence_level (float): VaR confidence level
+    - n_simulations (int): Number of scenarios
+    - horizon (int): Risk horizon in trading days
+    - chunk_size (int): Scenarios per chunk (by default sized to MAX_CHUNK_ELEMENTS)
+    - rng (int or numpy.random.Generator): Seed or generator
+    - periods_per_year (int): Trading days per year
+
+    Returns:
+    - dict: 'var' and 'es' (portfolio losses, positive numbers), 'value' (current
+      portfolio value), 'pnl' (portfolio P&L per scenario) and 'positions' (a DataFrame
+      with value, component_var, marginal_var and component_es per position)
+    """
+    spots, covariance, underlying_index = _prepare_positions(positions, spots, covariance)
+    K, T, sigma, quantity = (positions[column].to_numpy(dtype=float) for column in ('K', 'T', 'sigma', 'quantity'))
+    is_call = to_call_flag(positions['option_type'] if 'option_type' in positions.columns else 'call')
+    is_call = np.broadcast_to(is_call, K.shape)
+    if n_simulations <= 0 or horizon <= 0:
+        raise ValueError("n_simulations and horizon must be positive")
+
+    dt = horizon / periods_per_year
+    S0 = spots.to_numpy()
+    L = np.linalg.cholesky(covariance * dt)
+    drift = (r - 0.5 * np.diag(covariance)) * dt
+    values = quantity * calculate_black_scholes_batch(S0[underlying_index], K, T, r, sigma, is_call)
+    T_horizon = T - dt
+
+    if chunk_size is None:
+        chunk_size = max(1, MAX_CHUNK_ELEMENTS // max(len(positions), 1))
+    n_tail = max(1, int(np.ceil((1 - confidence_level) * n_simulations)))
+    # Scenarios ranked on either side of the VaR quantile used for the Euler allocation
+    band = max(1, n_simulations // 200)
+    n_keep = min(n_simulations, n_tail + band)
+
+    rng = np.random.default_rng(rng)
+    portfolio_pnl = np.empty(n_simulations)
+    kept_pnl = np.empty(0)
+    kept_positions = np.empty((0, len(positions)))
+    for start in range(0, n_simulations, chunk_size):
+        n = min(chunk_size, n_simulations - start)
+        scenario_spots = S0 * np.exp(drift + rng.standard_normal((n, len(S0))) @ L.T)
+        position_pnl = quantity * calculate_black_scholes_batch(
+            scenario_spots[:, underlying_index], K, T_horizon, r, sigma, is_call
+        ) - values
+        chunk_pnl = position_pnl.sum(axis=1)
+        portfolio_pnl[start:start + n] = chunk_pnl
+
+        # Keep position-level P&L only for the n_keep worst scenarios seen so far
+        kept_pnl = np.concatenate([kept_pnl, chunk_pnl])
+        kept_positions = np.concatenate([kept_positions, position_pnl])
+        if kept_pnl.size > n_keep:
+            worst = np.argpartition(kept_pnl, n_keep - 1)[:n_keep]
+            kept_pnl, kept_positions = kept_pnl[worst], kept_positions[worst]
+
+    order = np.argsort(kept_pnl, kind='stable')
+    kept_pnl, kept_positions = kept_pnl[order], kept_positions[order]
+    var = -np.percentile(portfolio_pnl, (1 - confidence_level) * 100)
+    es = -kept_pnl[:n_tail].mean()
+
+    neighbourhood = kept_positions[max(0, n_tail - band):n_keep]
+    component_var = -neighbourhood.mean(axis=0)
+    total = component_var.sum()
+    if abs(total) > 0:
+        component_var *= var / total
+    with np.errstate(divide='ignore', invalid='ignore'):
+        marginal_var = np.where(quantity != 0, component_var / quantity, 0.0)
+
+    return {
+        'var': var,
+        'es': es,
+        'value': values.sum(),
+        'pnl': portfolio_pnl,
+        'positions': pd.DataFrame({
+            'value': values,
+            'component_var': component_var,
+            'marginal_var': marginal_var,
+            'component_es': -kept_positions[:n_tail].mean(axis=0),
+        }, index=positions.index),
+    }
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    tickers = [f"U{i:02d}" for i in range(30)]
+    vols = rng.uniform(0.15, 0.5, len(tickers))
+    correlation = 0.3 + 0.7 * np.eye(len(tickers))
+    covariance = pd.DataFrame(correlation * np.outer(vols, vols), index=tickers, columns=tickers)
+    spots = pd.Series(rng.uniform(50, 150, len(tickers)), index=tickers)
+
+    n_positions = 3000
+    positions = pd.DataFrame({
+        'underlying': rng.choice(tickers, n_positions),
+        'option_type': rng.choice(['call', 'put'], n_positions),
+        'T': rng.uniform(0.1, 2.0, n_positions),
+        'quantity': rng.integers(-50, 50, n_positions),
+    })
+    positions['K'] = spots[positions['underlying']].to_numpy() * rng.uniform(0.8, 1.2, n_positions)
+    positions['sigma'] = vols[spots.index.get_indexer(positions['underlying'])]
+
+    start = time.perf_counter()
+    risk = simulate_portfolio_risk(positions, spots, covariance, r=0.03, n_simulations=20000)
+    elapsed = time.perf_counter() - start
+    print(f"{n_positions} positions x 20,000 scenarios in {elapsed:.2f}s")
+    print(f"Portfolio value {risk['value']:,.0f}, 95% 1-day VaR {risk['var']:,.0f}, ES {risk['es']:,.0f}")
+    print(f"Sum of component VaR {risk['positions']['component_var'].sum():,.0f}, "
+          f"sum of component ES {risk['positions']['component_es'].sum():,.0f}")
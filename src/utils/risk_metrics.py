@@ -1,42 +1,245 @@
 import numpy as np
-from scipy.stats import norm
-from .black_scholes import calculate_black_scholes
+from .black_scholes import calculate_black_scholes, calculate_black_scholes_batch
+from .greeks import calculate_greeks
+from .parallel import DEFAULT_CHUNK_SIZE, map_simulation_chunks
+from .variance_reduction import ERROR_BATCHES, normal_stream, parse_variance_reduction
+from .volatility import TRADING_DAYS, conditional_variance
 
-def calculate_var(S, K, T, r, sigma, option_type, confidence_level, n_simulations):
+HISTORICAL_METHODS = ('historical', 'ewma', 'garch')
+REVALUATION_METHODS = ('full', 'delta_gamma')
+
+def taylor_revaluation(S, K, T, r, sigma, option_type, dS, dt=0.0):
     """
-    Calculate Value at Risk (VaR) using Monte Carlo simulation
+    Delta-gamma-theta estimate of the option value after a spot move and elapsed time.
+
+    All Greeks come from one calculate_greeks call, so scenarios cost a few multiply-adds
+    each instead of a full Black-Scholes evaluation. Volatility is held at sigma, as in
+    full revaluation; the expansion is only accurate for short horizons.
+
+    Parameters:
+    - dS (array_like): Spot moves
+    - dt (float): Time elapsed (in years)
+
+    Returns:
+    - numpy.ndarray: Approximate option value per scenario
+    """
+    greeks = calculate_greeks(S, K, T, r, sigma, option_type)
+    return (
+        calculate_black_scholes(S, K, T, r, sigma, option_type)
+        + greeks['delta'] * dS + 0.5 * greeks['gamma'] * dS**2
+        + greeks['theta'] * dt
+    )
+
+def _revalue(S, K, T, r, sigma, option_type, scenario_spots, revaluation, dt=0.0):
+    """
+    Option value under every scenario spot, by full repricing or by Taylor approximation.
+    """
+    if revaluation == 'full':
+        return calculate_black_scholes_batch(scenario_spots, K, T - dt, r, sigma, option_type)
+    elif revaluation == 'delta_gamma':
+        return taylor_revaluation(S, K, T, r, sigma, option_type, scenario_spots - S, dt=dt)
+    raise ValueError(f"Unknown revaluation method: {revaluation}")
+
+def _revaluation_error(S, K, T, r, sigma, option_type, scenario_spots, values, var, error_check, rng, dt=0.0):
     """
-    np.random.seed(42)
-    dt = T / 252
-    n_steps = int(T * 252)
+    Fully reprice a random sample of the tail scenarios and compare with their approximate values.
+    """
+    tail = np.flatnonzero(values <= var)
+    sample = np.random.default_rng(rng).choice(tail, min(error_check, tail.size), replace=False)
+    errors = values[sample] - calculate_black_scholes_batch(scenario_spots[sample], K, T - dt, r, sigma, option_type)
+    return {
+        'scenarios': sample.size,
+        'mean_error': errors.mean(),
+        'max_abs_error': np.abs(errors).max(),
+    }
+
+def _simulate_option_values(S, K, T, r, sigma, option_type, sampling, shock_time, dt, revaluation, with_spots,
+                            n_simulations, rng):
+    """
+    Sample spots shock_time years ahead and revalue the option under every scenario in one vectorized call.
+
+    Returns:
+    - numpy.ndarray: Option values, shape (n_simulations,), or scenario spots and option
+      values, shape (2, n_simulations), with with_spots
+    """
+    Z = next(normal_stream(1, 1, n_simulations, rng, sampling))[0]
+    scenario_spots = S * np.exp((r - 0.5 * sigma**2) * shock_time + sigma * np.sqrt(shock_time) * Z)
+    values = _revalue(S, K, T, r, sigma, option_type, scenario_spots, revaluation, dt)
+    return np.stack([scenario_spots, values]) if with_spots else values
+
+def _tail_statistics(values, confidence_level):
+    var = np.percentile(values, (1 - confidence_level) * 100)
+    return var, values[values <= var].mean()
+
+def simulate_option_risk(S, K, T, r, sigma, option_type, confidence_level, n_simulations, rng=42, workers=None,
+                         variance_reduction=None, horizon=None, periods_per_year=TRADING_DAYS, revaluation='full',
+                         error_check=0):
+    """
+    Run one Monte Carlo simulation and derive VaR, Expected Shortfall and the scenario P&L from it.
+
+    Terminal prices are sampled directly from the lognormal GBM distribution, so no
+    (n_simulations, n_steps) path matrix is held, and every scenario is repriced in a
+    single vectorized Black-Scholes call. With workers set, scenarios are simulated in
+    chunks with per-chunk random streams on a process pool and concatenated, so the
+    result does not depend on the number of workers.
+
+    variance_reduction selects 'antithetic', 'moment_matching' or 'sobol' sampling of the
+    terminal shocks. Standard errors come from the spread of VaR and ES across batches
+    of scenarios (independent scramblings for Sobol).
 
-    if n_simulations <= 0 or S <= 0 or sigma <= 0 or T <= 0:
+    With a horizon, spots are shocked over horizon trading days and the option is
+    repriced that much closer to expiry, so revaluation='delta_gamma' can replace the
+    full repricing as in historical_option_risk. Without one, spots are shocked over the
+    whole maturity and repriced at maturity T.
+
+    Parameters:
+    - horizon (int): Risk horizon in trading days, or None for the whole maturity
+    - periods_per_year (int): Trading days per year, used to convert the horizon
+    - revaluation (str): 'full', or 'delta_gamma' for taylor_revaluation
+    - error_check (int): Tail scenarios to fully reprice when approximating
+
+    Returns:
+    - dict: 'var' and 'es' (quantile and tail mean of the scenario option values), their
+      standard errors 'var_stderr' and 'es_stderr', 'values' (scenario option values),
+      'pnl' (scenario values minus the current price) and, with error_check,
+      'revaluation_error', or None for invalid inputs
+    """
+    sampling, use_control = parse_variance_reduction(variance_reduction)
+    if use_control:
+        raise ValueError("Control variates apply to expectations, not to VaR/ES quantiles")
+    if revaluation not in REVALUATION_METHODS:
+        raise ValueError(f"Unknown revaluation method: {revaluation}")
+    if n_simulations <= 0 or S <= 0 or sigma <= 0 or T <= 0 or (horizon is not None and horizon < 1):
         return None  # Invalid inputs
 
     try:
-        Z = np.random.standard_normal((n_simulations, n_steps))
-        S_paths = S * np.exp(np.cumsum((r - 0.5 * sigma**2) * dt + sigma * np.sqrt(dt) * Z, axis=1))
-        final_values = [calculate_black_scholes(s, K, T, r, sigma, option_type) for s in S_paths[:, -1]]
-        return np.percentile(final_values, (1 - confidence_level) * 100)
+        shock_time, dt = (T, 0.0) if horizon is None else (horizon / periods_per_year,) * 2
+        with_spots = bool(error_check) and revaluation != 'full'
+        args = (S, K, T, r, sigma, option_type, sampling, shock_time, dt, revaluation, with_spots)
+        if sampling == 'sobol':
+            # Every Sobol chunk is an independent scrambling and one error batch, so there must be
+            # at least ERROR_BATCHES of them whatever the worker count
+            chunk_size = -(-n_simulations // ERROR_BATCHES)
+            if workers is not None:
+                chunk_size = min(chunk_size, DEFAULT_CHUNK_SIZE)
+            batches = map_simulation_chunks(_simulate_option_values, n_simulations, rng, workers or 1, chunk_size,
+                                            args=args)
+        elif workers is not None:
+            batches = map_simulation_chunks(_simulate_option_values, n_simulations, rng, workers, args=args)
+        else:
+            batches = [_simulate_option_values(*args, n_simulations, rng)]
+        if with_spots:
+            scenario_spots = np.concatenate([batch[0] for batch in batches])
+            batches = [batch[1] for batch in batches]
+        values = np.concatenate(batches)
+        if sampling != 'sobol':
+            batches = np.array_split(values, ERROR_BATCHES)
+
+        var, es = _tail_statistics(values, confidence_level)
+        batch_var, batch_es = np.array([_tail_statistics(batch, confidence_level) for batch in batches]).T
+        risk = {
+            'var': var,
+            'es': es,
+            'var_stderr': batch_var.std(ddof=1) / np.sqrt(len(batches)),
+            'es_stderr': batch_es.std(ddof=1) / np.sqrt(len(batches)),
+            'values': values,
+            'pnl': values - calculate_black_scholes(S, K, T, r, sigma, option_type),
+        }
+        if with_spots:
+            risk['revaluation_error'] = _revaluation_error(S, K, T, r, sigma, option_type, scenario_spots, values,
+                                                           var, error_check, 0, dt)
+        return risk
     except Exception as e:
         return None
 
-def calculate_expected_shortfall(S, K, T, r, sigma, option_type, confidence_level, n_simulations):
+def horizon_returns(close, horizon=1, method='historical', decay=0.94):
     """
-    Calculate Expected Shortfall (Conditional VaR) using Monte Carlo simulation
+    Overlapping horizon log returns of a price history, optionally volatility-filtered.
+
+    'historical' takes log(close[t + horizon] / close[t]) for every t. 'ewma' and 'garch'
+    (filtered historical simulation) first divide every daily return by its conditional
+    volatility and rescale it by the latest forecast, so the scenarios reflect today's
+    volatility regime; the filtered daily returns are then summed over overlapping
+    windows. Both use one cumulative sum, so all windows cost O(n).
+
+    Returns:
+    - numpy.ndarray: One return scenario per overlapping window
     """
-    np.random.seed(42)
-    dt = T / 252
-    n_steps = int(T * 252)
+    daily = np.diff(np.log(np.asarray(close, dtype=float)))
+    if method in ('ewma', 'garch'):
+        variance = conditional_variance(daily, method, decay)
+        daily = daily / np.sqrt(variance[:-1]) * np.sqrt(variance[-1])
+    elif method != 'historical':
+        raise ValueError(f"Unknown historical method: {method}")
+    cumulative = np.concatenate([[0.0], np.cumsum(daily)])
+    return cumulative[horizon:] - cumulative[:-horizon]
+
+def historical_option_risk(S, K, T, r, sigma, option_type, confidence_level, close, horizon=1, method='historical',
+                           decay=0.94, periods_per_year=TRADING_DAYS, revaluation='full', error_check=0):
+    """
+    Historical-simulation VaR and Expected Shortfall of an option position.
+
+    Every overlapping horizon return observed in close is applied to today's spot and
+    the option is repriced horizon days closer to expiry, all scenarios in one
+    vectorized Black-Scholes call at an unchanged sigma.
 
-    if n_simulations <= 0 or S <= 0 or sigma <= 0 or T <= 0:
+    Parameters:
+    - close (array_like): Daily closing prices, oldest first
+    - horizon (int): Risk horizon in trading days
+    - method (str): 'historical', or 'ewma'/'garch' for filtered historical simulation
+    - decay (float): EWMA decay factor
+    - periods_per_year (int): Trading days per year, used to shorten the maturity
+    - revaluation (str): 'full', or 'delta_gamma' for taylor_revaluation (spot and time moves
+      only, sigma unchanged, like full revaluation)
+    - error_check (int): Tail scenarios to fully reprice when approximating
+
+    Returns:
+    - dict: 'var' and 'es' (quantile and tail mean of the scenario option values),
+      'values' (scenario option values), 'pnl' (scenario values minus the current price),
+      'returns' (the horizon return scenarios) and, with error_check, 'revaluation_error',
+      or None for invalid inputs
+    """
+    if revaluation not in REVALUATION_METHODS:
+        raise ValueError(f"Unknown revaluation method: {revaluation}")
+    if S <= 0 or sigma <= 0 or T <= 0 or horizon < 1:
         return None  # Invalid inputs
 
     try:
-        Z = np.random.standard_normal((n_simulations, n_steps))
-        S_paths = S * np.exp(np.cumsum((r - 0.5 * sigma**2) * dt + sigma * np.sqrt(dt) * Z, axis=1))
-        final_values = [calculate_black_scholes(s, K, T, r, sigma, option_type) for s in S_paths[:, -1]]
-        var = np.percentile(final_values, (1 - confidence_level) * 100)
-        return np.mean([v for v in final_values if v <= var])
+        returns = horizon_returns(close, horizon, method, decay)
+        if returns.size == 0:
+            return None
+        dt = horizon / periods_per_year
+        scenario_spots = S * np.exp(returns)
+        values = _revalue(S, K, T, r, sigma, option_type, scenario_spots, revaluation, dt)
+        var, es = _tail_statistics(values, confidence_level)
+        risk = {
+            'var': var,
+            'es': es,
+            'values': values,
+            'pnl': values - calculate_black_scholes(S, K, T, r, sigma, option_type),
+            'returns': returns,
+        }
+        if error_check and revaluation != 'full':
+            risk['revaluation_error'] = _revaluation_error(S, K, T, r, sigma, option_type, scenario_spots, values,
+                                                           var, error_check, 0, dt)
+        return risk
     except Exception as e:
         return None
+
+def calculate_var(S, K, T, r, sigma, option_type, confidence_level, n_simulations, workers=None, horizon=None,
+                  revaluation='full', error_check=0):
+    """
+    Calculate Value at Risk (VaR) using Monte Carlo simulation
+    """
+    risk = simulate_option_risk(S, K, T, r, sigma, option_type, confidence_level, n_simulations, workers=workers,
+                                horizon=horizon, revaluation=revaluation, error_check=error_check)
+    return None if risk is None else risk['var']
+
+def calculate_expected_shortfall(S, K, T, r, sigma, option_type, confidence_level, n_simulations, workers=None,
+                                 horizon=None, revaluation='full', error_check=0):
+    """
+    Calculate Expected Shortfall (Conditional VaR) using Monte Carlo simulation
+    """
+    risk = simulate_option_risk(S, K, T, r, sigma, option_type, confidence_level, n_simulations, workers=workers,
+                                horizon=horizon, revaluation=revaluation, error_check=error_check)
+    return None if risk is None else risk['es']
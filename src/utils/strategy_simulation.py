@@ -1,18 +1,100 @@
 import numpy as np
-import plotly.graph_objects as go
+from .black_scholes import calculate_black_scholes_batch, to_call_flag
+from .greeks import calculate_greeks
 
-def simulate_strategy(strategy, S_range, K, call_price, put_price):
+# A strategy is an array of legs: option type, strike, expiry (in years) and signed quantity
+LEG_DTYPE = np.dtype([('is_call', bool), ('strike', 'f8'), ('expiry', 'f8'), ('quantity', 'f8')])
+STRATEGY_GREEKS = ('delta', 'gamma', 'theta', 'vega', 'rho')
+
+# Presets as (type, strike / K, expiry / T, quantity) per leg
+STRATEGY_PRESETS = {
+    'long_call': [('call', 1.0, 1.0, 1)],
+    'long_put': [('put', 1.0, 1.0, 1)],
+    'straddle': [('call', 1.0, 1.0, 1), ('put', 1.0, 1.0, 1)],
+    'strangle': [('call', 1.1, 1.0, 1), ('put', 0.9, 1.0, 1)],
+    'bull_call_spread': [('call', 1.0, 1.0, 1), ('call', 1.1, 1.0, -1)],
+    'bear_put_spread': [('put', 1.0, 1.0, 1), ('put', 0.9, 1.0, -1)],
+    'butterfly': [('call', 0.9, 1.0, 1), ('call', 1.0, 1.0, -2), ('call', 1.1, 1.0, 1)],
+    'iron_butterfly': [('put', 0.9, 1.0, 1), ('put', 1.0, 1.0, -1), ('call', 1.0, 1.0, -1), ('call', 1.1, 1.0, 1)],
+    'iron_condor': [('put', 0.85, 1.0, 1), ('put', 0.95, 1.0, -1), ('call', 1.05, 1.0, -1), ('call', 1.15, 1.0, 1)],
+    'calendar_spread': [('call', 1.0, 0.5, -1), ('call', 1.0, 1.0, 1)],
+}
+
+
+def make_legs(option_type, strike, expiry, quantity):
     """
-    Simulate common option strategies (e.g., straddle, strangle).
+    Build a leg array from per-leg types ('call'/'put' or booleans), strikes, expiries and quantities.
     """
-    if strategy == 'straddle':
-        pnl = np.maximum(S_range - K, 0) - call_price + np.maximum(K - S_range, 0) - put_price
-    elif strategy == 'strangle':
-        pnl = (np.maximum(S_range - K + 10, 0) - call_price
-               + np.maximum(K - 10 - S_range, 0) - put_price)
-    else:
+    is_call = to_call_flag(option_type)
+    strike, expiry, quantity = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (strike, expiry, quantity)))
+    legs = np.empty(strike.size, dtype=LEG_DTYPE)
+    legs['is_call'] = np.broadcast_to(is_call, strike.shape).ravel()
+    legs['strike'] = strike.ravel()
+    legs['expiry'] = expiry.ravel()
+    legs['quantity'] = quantity.ravel()
+    return legs
+
+
+def strategy_legs(strategy, K, T):
+    """
+    Instantiate a preset around a centre strike K and a maturity T.
+    """
+    if strategy not in STRATEGY_PRESETS:
         raise ValueError(f"Unknown strategy: {strategy}")
+    option_type, strike, expiry, quantity = zip(*STRATEGY_PRESETS[strategy])
+    return make_legs(option_type, np.multiply(strike, K), np.multiply(expiry, T), quantity)
+
+
+def evaluate_strategy(legs, S_grid, r, sigma, spot, times=None):
+    """
+    Evaluate a multi-leg strategy over a grid of spot prices and evaluation times.
+
+    Every (time, spot, leg) combination is priced in one broadcast Black-Scholes call
+    and one Greeks call, then summed over legs. Legs past their expiry at an evaluation
+    time are worth their intrinsic value.
+
+    Parameters:
+    - legs (numpy.ndarray): Legs with dtype LEG_DTYPE (see make_legs and strategy_legs)
+    - S_grid (array_like): Spot prices to evaluate
+    - r (float): Risk-free interest rate
+    - sigma (float or array_like): Volatility, or one per leg
+    - spot (float): Current spot, which sets the cost of entering the strategy
+    - times (array_like): Years from today to evaluate at (default: today and the first expiry)
+
+    Returns:
+    - dict: 'spots', 'times', 'cost', 'values' and 'pnl' (times x spots), 'greeks'
+      ({name: times x spots}) and 'breakevens' (spots where the P&L at the first expiry crosses zero)
+    """
+    S_grid = np.asarray(S_grid, dtype=float)
+    times = np.array([0.0, legs['expiry'].min()]) if times is None else np.asarray(times, dtype=float)
+    quantity = legs['quantity']
+
+    # Axes: (time, spot, leg)
+    remaining = legs['expiry'] - times[:, None, None]
+    args = (S_grid[None, :, None], legs['strike'], remaining, r, sigma, legs['is_call'])
+    values = np.sum(quantity * calculate_black_scholes_batch(*args), axis=-1)
+    greeks = calculate_greeks(*args)
+    greeks = {name: np.sum(quantity * greeks[name], axis=-1) for name in STRATEGY_GREEKS}
+
+    cost = np.sum(quantity * calculate_black_scholes_batch(spot, legs['strike'], legs['expiry'], r, sigma,
+                                                           legs['is_call']))
+    pnl = values - cost
+
+    # Linear interpolation of the sign changes of the P&L at the first expiry
+    expiry_pnl = np.sum(quantity * calculate_black_scholes_batch(
+        S_grid[:, None], legs['strike'], legs['expiry'] - legs['expiry'].min(), r, sigma, legs['is_call']
+    ), axis=-1) - cost
+    crossings = np.flatnonzero(np.sign(expiry_pnl[:-1]) * np.sign(expiry_pnl[1:]) < 0)
+    left, right = expiry_pnl[crossings], expiry_pnl[crossings + 1]
+    breakevens = S_grid[crossings] + (S_grid[crossings + 1] - S_grid[crossings]) * left / (left - right)
+
+    return {
+        'spots': S_grid,
+        'times': times,
+        'cost': cost,
+        'values': values,
+        'pnl': pnl,
+        'greeks': greeks,
+        'breakevens': breakevens,
+    }
 
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=S_range, y=pnl, mode='lines', name=strategy))
-    return fig
@@ -0,0 +1,148 @@
+import warnings
+
+import numpy as np
+from scipy.special import ndtri
+
+SAMPLING_METHODS = ('plain', 'antithetic', 'moment_matching', 'sobol')
+VARIANCE_REDUCTION = SAMPLING_METHODS + ('control_variate',)
+ERROR_BATCHES = 8  # Batches (e.g. independent Sobol scramblings) used for batch-spread standard errors
+
+
+def parse_variance_reduction(variance_reduction):
+    """
+    Split a variance reduction choice into (sampling method, use control variate).
+
+    Parameters:
+    - variance_reduction (str, sequence or None): One of VARIANCE_REDUCTION, or a sequence
+      combining 'control_variate' with at most one sampling method
+
+    Returns:
+    - tuple: (sampling method, bool)
+    """
+    if variance_reduction is None:
+        variance_reduction = ()
+    elif isinstance(variance_reduction, str):
+        variance_reduction = (variance_reduction,)
+    unknown = [method for method in variance_reduction if method not in VARIANCE_REDUCTION]
+    if unknown:
+        raise ValueError(f"Unknown variance reduction: {unknown}")
+    sampling = [method for method in variance_reduction if method in SAMPLING_METHODS]
+    if len(sampling) > 1:
+        raise ValueError(f"Choose at most one sampling method, got {sampling}")
+    return (sampling[0] if sampling else 'plain'), 'control_variate' in variance_reduction
+
+
+def brownian_bridge(Z):
+    """
+    Turn standard normals in Brownian-bridge order into standard normal increments in time order.
+
+    Z[0] fixes the terminal value of the Brownian motion, Z[1] the midpoint and so on by
+    bisection, so the leading (best equidistributed) quasi-random dimensions carry most
+    of the path variance.
+
+    Parameters:
+    - Z (numpy.ndarray): Standard normals of shape (n_steps, ...)
+
+    Returns:
+    - numpy.ndarray: Standardized increments of the same shape
+    """
+    n_steps = Z.shape[0]
+    W = np.empty_like(Z)
+    W[-1] = np.sqrt(n_steps) * Z[0]
+
+    # Breadth-first bisection over (left, right) step indices; -1 stands for time zero
+    k = 1
+    intervals = [(-1, n_steps - 1)]
+    while intervals:
+        left, right = intervals.pop(0)
+        middle = (left + right + 1) // 2
+        if middle == right:
+            continue
+        left_weight = (right - middle) / (right - left)
+        std = np.sqrt((middle - left) * (right - middle) / (right - left))
+        W_left = W[left] if left >= 0 else 0.0
+        W[middle] = left_weight * W_left + (1 - left_weight) * W[right] + std * Z[k]
+        k += 1
+        intervals += [(left, middle), (middle, right)]
+
+    return np.diff(W, axis=0, prepend=np.zeros((1,) + Z.shape[1:]))
+
+
+def sobol_normals(n_steps, n_dims, n_paths, rng):
+    """
+    Scrambled Sobol normals of shape (n_steps, n_dims, n_paths), Brownian-bridge ordered per dimension.
+    """
+    from scipy.stats import qmc
+
+    seed = np.random.default_rng(rng).integers(2**63)
+    with warnings.catch_warnings():
+        # Path counts are set by the caller; a non-power-of-2 count only loses some balance
+        warnings.simplefilter('ignore', UserWarning)
+        points = qmc.Sobol(n_steps * n_dims, scramble=True, seed=seed).random(n_paths)
+    Z = ndtri(np.clip(points, 1e-16, 1 - 1e-16)).T.reshape(n_steps, n_dims, n_paths)
+    return brownian_bridge(Z)
+
+
+def normal_stream(n_steps, n_dims, n_paths, rng=None, sampling='plain'):
+    """
+    Yield one (n_dims, n_paths) array of standard normals per time step.
+
+    - 'plain': independent pseudo-random draws
+    - 'antithetic': every draw is followed by its negation, so paths come in adjacent pairs
+    - 'moment_matching': every step is rescaled to exact zero mean and unit variance
+    - 'sobol': scrambled Sobol points with Brownian-bridge construction; the whole
+      (n_steps, n_dims, n_paths) block is generated up front
+    """
+    rng = np.random.default_rng(rng)
+    if sampling == 'sobol':
+        yield from sobol_normals(n_steps, n_dims, n_paths, rng)
+        return
+
+    for _ in range(n_steps):
+        if sampling == 'antithetic':
+            Z = rng.standard_normal((n_dims, (n_paths + 1) // 2))
+            yield np.stack([Z, -Z], axis=-1).reshape(n_dims, -1)[:, :n_paths]
+        elif sampling == 'moment_matching':
+            Z = rng.standard_normal((n_dims, n_paths))
+            yield (Z - Z.mean(axis=1, keepdims=True)) / Z.std(axis=1, keepdims=True)
+        else:
+            yield rng.standard_normal((n_dims, n_paths))
+
+
+def effective_samples(samples, sampling):
+    """
+    Collapse antithetic pairs into their averages, which are independent of each other.
+    """
+    if sampling == 'antithetic':
+        n_pairs = samples.shape[-1] // 2
+        return samples[..., :2 * n_pairs].reshape(samples.shape[:-1] + (n_pairs, 2)).mean(axis=-1)
+    return samples
+
+
+def combine_estimates(batches, control_mean=None, batch_errors=False):
+    """
+    Merge Monte Carlo samples from one or more batches into an estimate and its standard error.
+
+    Parameters:
+    - batches (list): (samples, control samples or None) per batch
+    - control_mean (float): Known expectation of the control; enables the control variate
+    - batch_errors (bool): Estimate the standard error from the spread of batch means
+      (for randomized quasi-Monte Carlo) instead of from the individual samples
+
+    Returns:
+    - tuple: (estimate, standard error)
+    """
+    samples = [np.asarray(batch[0], dtype=float) for batch in batches]
+    if control_mean is not None:
+        controls = [np.asarray(batch[1], dtype=float) for batch in batches]
+        Y, X = np.concatenate(samples), np.concatenate(controls)
+        X_centred = X - X.mean()
+        beta = np.dot(Y - Y.mean(), X_centred) / max(np.dot(X_centred, X_centred), 1e-300)
+        samples = [y - beta * (x - control_mean) for y, x in zip(samples, controls)]
+
+    estimate = np.mean(np.concatenate(samples))
+    if batch_errors and len(samples) > 1:
+        batch_means = np.array([s.mean() for s in samples])
+        return estimate, batch_means.std(ddof=1) / np.sqrt(len(samples))
+    all_samples = np.concatenate(samples)
+    return estimate, all_samples.std(ddof=1) / np.sqrt(all_samples.size)
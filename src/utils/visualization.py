@@ -1,24 +1,48 @@
 import plotly.graph_objects as go
-from .black_scholes import calculate_black_scholes
+from .price_grid import calculate_price_grid
 import numpy as np
 
-def create_interactive_heatmap(S_range, sigma_range, K, T, r, option_type):
+AXIS_LABELS = {
+    'S': "Stock Price ($)",
+    'K': "Strike Price ($)",
+    'T': "Time to Maturity (years)",
+    'r': "Risk-Free Rate (%)",
+    'sigma': "Volatility (%)",
+}
+PERCENT_AXES = ('r', 'sigma')
+
+
+def create_heatmap_figure(prices, x_param, x_values, y_param, y_values):
     """
-    Create an interactive heatmap for option prices.
+    Build a Plotly heatmap from a precomputed price grid.
     """
-    prices = np.array([
-        [calculate_black_scholes(s, K, T, r, sigma, option_type) for s in S_range]
-        for sigma in sigma_range
-    ])
+    x_values = np.asarray(x_values) * (100 if x_param in PERCENT_AXES else 1)
+    y_values = np.asarray(y_values) * (100 if y_param in PERCENT_AXES else 1)
     fig = go.Figure(data=go.Heatmap(
         z=prices,
-        x=S_range,
-        y=sigma_range * 100,
+        x=x_values,
+        y=y_values,
         colorscale='Viridis',
         colorbar=dict(title="Option Price ($)")
     ))
+    fig.update_layout(xaxis_title=AXIS_LABELS[x_param], yaxis_title=AXIS_LABELS[y_param])
     return fig
 
+def create_sensitivity_heatmap(x_param, x_values, y_param, y_values, S, K, T, r, sigma, option_type,
+                               backend='analytic', exercise='european'):
+    """
+    Create an interactive heatmap of option prices over any two inputs.
+    """
+    prices = calculate_price_grid(x_param, x_values, y_param, y_values, S, K, T, r, sigma, option_type,
+                                  backend, exercise)
+    return create_heatmap_figure(prices, x_param, x_values, y_param, y_values)
+
+def create_interactive_heatmap(S_range, sigma_range, K, T, r, option_type):
+    """
+    Create an interactive heatmap for option prices.
+    """
+    return create_sensitivity_heatmap('S', S_range, 'sigma', sigma_range, None, K, T, r, None, option_type)
+
 def create_draggable_pnl_chart(S_range, K, current_price, option_type):
     """
     Create a P&L chart with draggable lines.
@@ -33,3 +57,24 @@ def create_draggable_pnl_chart(S_range, K, current_price, option_type):
         dragmode="pan",
     )
     return fig
+
+def create_strategy_figure(result, title="Strategy"):
+    """
+    Plot the P&L of an evaluated strategy (see evaluate_strategy) against spot, one line per evaluation time.
+    """
+    fig = go.Figure()
+    for time, pnl in zip(result['times'], result['pnl']):
+        fig.add_trace(go.Scatter(x=result['spots'], y=pnl, mode='lines', name=f"t = {time:.2f}y"))
+    fig.add_hline(y=0, line_dash="dot", line_color="gray")
+    fig.update_layout(title=title, xaxis_title="Stock Price ($)", yaxis_title="Profit/Loss ($)")
+    return fig
+
+def create_strategy_greeks_figure(result, greek):
+    """
+    Plot one aggregate Greek of an evaluated strategy against spot, one line per evaluation time.
+    """
+    fig = go.Figure()
+    for time, values in zip(result['times'], result['greeks'][greek]):
+        fig.add_trace(go.Scatter(x=result['spots'], y=values, mode='lines', name=f"t = {time:.2f}y"))
+    fig.update_layout(xaxis_title="Stock Price ($)", yaxis_title=greek.capitalize())
+    return fig
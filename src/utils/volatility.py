@@ -0,0 +1,206 @@
+import numpy as np
+
+TRADING_DAYS = 252
+ESTIMATORS = ('close_to_close', 'parkinson', 'garman_klass', 'rogers_satchell', 'yang_zhang', 'ewma')
+
+
+def _rolling_mean(x, window):
+    """
+    Mean of every trailing window via one cumulative sum, aligned to the window's last element.
+    The first window - 1 entries are NaN.
+    """
+    x = np.asarray(x, dtype=float)
+    result = np.full(x.shape, np.nan)
+    if window > x.size:
+        return result
+    cumulative = np.concatenate([[0.0], np.cumsum(x)])
+    result[window - 1:] = (cumulative[window:] - cumulative[:-window]) / window
+    return result
+
+
+def _rolling_var(x, window):
+    """
+    Sample variance (ddof=1) of every trailing window from cumulative sums of x and x**2.
+    """
+    x = np.asarray(x, dtype=float)
+    # Centring first keeps the E[x^2] - E[x]^2 difference from cancelling catastrophically
+    centred = x - np.nanmean(x)
+    mean = _rolling_mean(centred, window)
+    mean_sq = _rolling_mean(centred**2, window)
+    return np.maximum(mean_sq - mean**2, 0) * window / (window - 1)
+
+
+def _annualize(variance, periods_per_year):
+    return np.sqrt(variance * periods_per_year)
+
+
+def close_to_close(close, window=21, periods_per_year=TRADING_DAYS):
+    """
+    Rolling close-to-close volatility (standard deviation of log returns).
+    """
+    returns = np.diff(np.log(close), prepend=np.nan)
+    variance = np.full(returns.shape, np.nan)
+    variance[1:] = _rolling_var(returns[1:], window)
+    return _annualize(variance, periods_per_year)
+
+
+def parkinson(high, low, window=21, periods_per_year=TRADING_DAYS):
+    """
+    Rolling Parkinson (1980) high-low range volatility.
+    """
+    log_range = np.log(np.asarray(high) / np.asarray(low))
+    return _annualize(_rolling_mean(log_range**2, window) / (4 * np.log(2)), periods_per_year)
+
+
+def garman_klass(open_, high, low, close, window=21, periods_per_year=TRADING_DAYS):
+    """
+    Rolling Garman-Klass (1980) OHLC volatility.
+    """
+    log_hl = np.log(np.asarray(high) / np.asarray(low))
+    log_co = np.log(np.asarray(close) / np.asarray(open_))
+    daily = 0.5 * log_hl**2 - (2 * np.log(2) - 1) * log_co**2
+    return _annualize(_rolling_mean(daily, window), periods_per_year)
+
+
+def _rogers_satchell_terms(open_, high, low, close):
+    open_, high, low, close = (np.asarray(x, dtype=float) for x in (open_, high, low, close))
+    return np.log(high / close) * np.log(high / open_) + np.log(low / close) * np.log(low / open_)
+
+
+def rogers_satchell(open_, high, low, close, window=21, periods_per_year=TRADING_DAYS):
+    """
+    Rolling Rogers-Satchell (1991) drift-independent OHLC volatility.
+    """
+    return _annualize(_rolling_mean(_rogers_satchell_terms(open_, high, low, close), window), periods_per_year)
+
+
+def yang_zhang(open_, high, low, close, window=21, periods_per_year=TRADING_DAYS):
+    """
+    Rolling Yang-Zhang (2000) volatility: overnight variance plus a weighted mix of
+    open-to-close and Rogers-Satchell variance, robust to drift and opening jumps.
+    """
+    open_, close = np.asarray(open_, dtype=float), np.asarray(close, dtype=float)
+    overnight = np.log(open_[1:] / close[:-1])
+    open_to_close = np.log(close / open_)
+    k = 0.34 / (1.34 + (window + 1) / (window - 1))
+
+    variance = np.full(close.shape, np.nan)
+    variance[1:] = (
+        _rolling_var(overnight, window)
+        + k * _rolling_var(open_to_close[1:], window)
+        + (1 - k) * _rolling_mean(_rogers_satchell_terms(open_, high, low, close)[1:], window)
+    )
+    return _annualize(variance, periods_per_year)
+
+
+def ewma(close, decay=0.94, periods_per_year=TRADING_DAYS):
+    """
+    Exponentially weighted (RiskMetrics) volatility of log returns.
+
+    The recursion sigma2[t] = decay * sigma2[t-1] + (1 - decay) * r[t]**2 runs as a
+    single linear filter, seeded with the first squared return.
+    """
+    from scipy.signal import lfilter
+
+    squared = np.diff(np.log(close)) ** 2
+    variance = np.full(len(close), np.nan)
+    if squared.size:
+        variance[1:], _ = lfilter([1 - decay], [1, -decay], squared, zi=[decay * squared[0]])
+    return _annualize(variance, periods_per_year)
+
+
+def realized_volatility(data, estimator='yang_zhang', window=21, periods_per_year=TRADING_DAYS, decay=0.94):
+    """
+    Rolling annualized volatility of a DataFrame of daily bars.
+
+    Parameters:
+    - data (pandas.DataFrame): Bars with Open, High, Low and Close columns
+    - estimator (str): One of ESTIMATORS
+    - window (int): Rolling window length in bars (ignored by 'ewma')
+    - periods_per_year (int): Bars per year used for annualization
+    - decay (float): Decay factor for 'ewma'
+
+    Returns:
+    - pandas.Series: Volatility aligned to the last bar of each window
+    """
+    import pandas as pd
+
+    open_, high, low, close = (data[column].to_numpy(dtype=float) for column in ('Open', 'High', 'Low', 'Close'))
+    if estimator == 'close_to_close':
+        values = close_to_close(close, window, periods_per_year)
+    elif estimator == 'parkinson':
+        values = parkinson(high, low, window, periods_per_year)
+    elif estimator == 'garman_klass':
+        values = garman_klass(open_, high, low, close, window, periods_per_year)
+    elif estimator == 'rogers_satchell':
+        values = rogers_satchell(open_, high, low, close, window, periods_per_year)
+    elif estimator == 'yang_zhang':
+        values = yang_zhang(open_, high, low, close, window, periods_per_year)
+    elif estimator == 'ewma':
+        values = ewma(close, decay, periods_per_year)
+    else:
+        raise ValueError(f"Unknown estimator: {estimator}")
+    return pd.Series(values, index=data.index, name=estimator)
+
+
+def conditional_variance(returns, method='ewma', decay=0.94, params=None):
+    """
+    One-step-ahead conditional variance forecasts of a daily return series.
+
+    Both recursions are linear in the squared returns and run as a single linear filter:
+    - 'ewma': sigma2[t+1] = decay * sigma2[t] + (1 - decay) * r[t]**2
+    - 'garch': sigma2[t+1] = omega + alpha * r[t]**2 + beta * sigma2[t]
+    Both are seeded with the sample variance.
+
+    Parameters:
+    - returns (array_like): Daily log returns
+    - method (str): 'ewma' or 'garch'
+    - decay (float): Decay factor for 'ewma'
+    - params (dict): GARCH(1,1) omega, alpha and beta (fitted with fit_garch if None)
+
+    Returns:
+    - numpy.ndarray: n + 1 daily variances; element t is the forecast for returns[t] and
+      the last element is the forecast for the next, unobserved day
+    """
+    from scipy.signal import lfilter
+
+    squared = np.asarray(returns, dtype=float) ** 2
+    seed = squared.mean()
+    if method == 'ewma':
+        forecasts = lfilter([1 - decay], [1, -decay], squared, zi=[decay * seed])[0]
+    elif method == 'garch':
+        params = params if params is not None else fit_garch(returns)
+        forecasts = lfilter([1], [1, -params['beta']], params['omega'] + params['alpha'] * squared,
+                            zi=[params['beta'] * seed])[0]
+    else:
+        raise ValueError(f"Unknown conditional variance method: {method}")
+    return np.concatenate([[seed], forecasts])
+
+
+def fit_garch(returns):
+    """
+    Fit a GARCH(1,1) model to daily returns by Gaussian maximum likelihood.
+
+    omega is tied to the sample variance (variance targeting), so only alpha and
+    beta are optimized; each likelihood evaluation is one O(n) filter pass.
+
+    Returns:
+    - dict: 'omega', 'alpha' and 'beta'
+    """
+    from scipy.optimize import minimize
+
+    returns = np.asarray(returns, dtype=float)
+    squared = returns**2
+    sample_variance = squared.mean()
+
+    def negative_log_likelihood(x):
+        alpha, beta = x
+        if alpha + beta >= 0.999:
+            return 1e10
+        params = dict(omega=sample_variance * (1 - alpha - beta), alpha=alpha, beta=beta)
+        variance = conditional_variance(returns, 'garch', params=params)[:-1]
+        return np.sum(np.log(variance) + squared / variance)
+
+    fit = minimize(negative_log_likelihood, [0.08, 0.9], method='L-BFGS-B', bounds=[(1e-6, 0.5), (0.0, 0.998)])
+    alpha, beta = fit.x
+    return dict(omega=sample_variance * (1 - alpha - beta), alpha=float(alpha), beta=float(beta))
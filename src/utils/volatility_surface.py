@@ -0,0 +1,221 @@
+import numpy as np
+from scipy.optimize import least_squares
+
+SVI_PARAMETERS = ('a', 'b', 'rho', 'm', 's')
+MIN_SVI_QUOTES = len(SVI_PARAMETERS)
+
+
+def svi_total_variance(k, a, b, rho, m, s):
+    """
+    Raw SVI total implied variance w(k) = a + b (rho (k - m) + sqrt((k - m)^2 + s^2)).
+    """
+    shifted = k - m
+    return a + b * (rho * shifted + np.sqrt(shifted**2 + s**2))
+
+
+def svi_butterfly_density(k, a, b, rho, m, s):
+    """
+    Gatheral's g(k) for an SVI slice; the slice is free of butterfly arbitrage where g(k) >= 0.
+    """
+    shifted = k - m
+    root = np.sqrt(shifted**2 + s**2)
+    w = a + b * (rho * shifted + root)
+    w_k = b * (rho + shifted / root)
+    w_kk = b * s**2 / root**3
+    return (1 - k * w_k / (2 * w))**2 - w_k**2 / 4 * (1 / w + 0.25) + w_kk / 2
+
+
+def fit_svi(k, total_variance, weights=None):
+    """
+    Fit raw SVI parameters to the total implied variance of one expiry slice.
+
+    A slice with fewer than MIN_SVI_QUOTES quotes cannot pin down five parameters, so
+    it gets flat total variance (b = 0) at the weighted mean of its quotes instead of a
+    fit that invents skew.
+
+    Parameters:
+    - k (array_like): Log-moneyness log(K / F)
+    - total_variance (array_like): Implied variance times expiry
+    - weights (array_like): Optional residual weights
+
+    Returns:
+    - numpy.ndarray: (a, b, rho, m, s)
+    """
+    k, total_variance = np.asarray(k, dtype=float), np.asarray(total_variance, dtype=float)
+    weights = np.ones_like(k) if weights is None else np.asarray(weights, dtype=float)
+    if k.size < MIN_SVI_QUOTES:
+        return np.array([np.average(total_variance, weights=weights), 0.0, 0.0, 0.0, 0.1])
+    atm = np.interp(0.0, k, total_variance) if k.size > 1 else total_variance[0]
+    x0 = np.array([0.5 * atm, 0.1, -0.3, 0.0, 0.1])
+
+    def residuals(x):
+        a, b, rho, m, s = x
+        # Penalize a negative minimum variance, a + b s sqrt(1 - rho^2) < 0
+        floor = np.minimum(a + b * s * np.sqrt(1 - rho**2), 0)
+        return np.append(weights * (svi_total_variance(k, *x) - total_variance), 1e3 * floor)
+
+    bounds = ([-np.inf, 0.0, -0.999, -np.inf, 1e-4], [np.inf, np.inf, 0.999, np.inf, np.inf])
+    return least_squares(residuals, x0, bounds=bounds, method='trf').x
+
+
+class VolatilitySurface:
+    """
+    Implied volatility surface from SVI slices, interpolated linearly in total variance.
+
+    Each expiry slice is an SVI curve in log-forward-moneyness k = log(K / F(T)) with
+    F(T) = S exp((r - q) T). Between slices total variance is interpolated linearly in T at
+    fixed k; before the first slice and after the last, implied volatility is held flat
+    at the nearest slice. The SVI parameters of all slices are kept as one (n_slices, 5)
+    array, so a lookup is a searchsorted plus a few array operations on the query arrays.
+
+    Pass a surface wherever sigma is accepted by the Black-Scholes pricers, the Greeks or
+    the price grid and it is evaluated at each contract's (K, T).
+    """
+
+    def __init__(self, S, r, q=0.0):
+        self.S = float(S)
+        self.r = float(r)
+        self.q = float(q)
+        self.expiries = np.empty(0)
+        self.params = np.empty((0, len(SVI_PARAMETERS)))
+
+    @classmethod
+    def from_quotes(cls, S, r, K, T, vols, q=0.0):
+        """
+        Build a surface by fitting SVI to every expiry of a set of implied vol quotes.
+        """
+        surface = cls(S, r, q)
+        K, T, vols = (np.asarray(x, dtype=float) for x in (K, T, vols))
+        for expiry in np.unique(T):
+            rows = T == expiry
+            surface.update_slice(expiry, K[rows], vols[rows])
+        return surface
+
+    def cache_key(self):
+        return (self.S, self.r, self.q, self.expiries.tobytes(), self.params.tobytes())
+
+    def forward(self, T):
+        return self.S * np.exp((self.r - self.q) * np.asarray(T, dtype=float))
+
+    def update_slice(self, T, K, vols, weights=None):
+        """
+        Fit (or refit) the slice at expiry T from its strikes and implied vols, leaving other slices untouched.
+        """
+        K, vols = np.asarray(K, dtype=float), np.asarray(vols, dtype=float)
+        order = np.argsort(K)
+        k = np.log(K[order] / self.forward(T))
+        params = fit_svi(k, vols[order]**2 * T, None if weights is None else np.asarray(weights)[order])
+        self.set_slice(T, params)
+
+    def set_slice(self, T, params):
+        """
+        Insert or replace the SVI parameters (a, b, rho, m, s) of the slice at expiry T.
+        """
+        index = np.searchsorted(self.expiries, T)
+        if index < self.expiries.size and np.isclose(self.expiries[index], T):
+            self.params[index] = params
+        else:
+            self.expiries = np.insert(self.expiries, index, T)
+            self.params = np.insert(self.params, index, params, axis=0)
+
+    def remove_slice(self, T):
+        index = np.flatnonzero(np.isclose(self.expiries, T))
+        self.expiries = np.delete(self.expiries, index)
+        self.params = np.delete(self.params, index, axis=0)
+
+    def total_variance(self, K, T):
+        """
+        Total implied variance at arbitrary strikes and expiries (inputs broadcast).
+        """
+        if self.expiries.size == 0:
+            raise ValueError("The surface has no slices")
+        K, T = np.broadcast_arrays(np.asarray(K, dtype=float), np.asarray(T, dtype=float))
+        k = np.log(K / self.forward(T))
+
+        # Bracketing slices; beyond either end both sides are the outermost slice
+        upper = np.clip(np.searchsorted(self.expiries, T), 0, self.expiries.size - 1)
+        lower = np.clip(upper - 1, 0, None)
+        lower = np.where((T <= self.expiries[0]) | (T >= self.expiries[-1]), upper, lower)
+        T_lower, T_upper = self.expiries[lower], self.expiries[upper]
+        w_lower = svi_total_variance(k, *np.moveaxis(self.params[lower], -1, 0))
+        w_upper = svi_total_variance(k, *np.moveaxis(self.params[upper], -1, 0))
+
+        same = upper == lower
+        weight = np.where(same, 0.0, (T - T_lower) / np.where(same, 1.0, T_upper - T_lower))
+        interpolated = (1 - weight) * w_lower + weight * w_upper
+        # Flat implied vol outside the quoted expiries: scale the end slice's variance with T
+        flat = w_lower / T_lower * T
+        return np.where(same, flat, interpolated)
+
+    def implied_vol(self, K, T):
+        """
+        Implied volatility at arbitrary strikes and expiries (inputs broadcast).
+        """
+        T = np.asarray(T, dtype=float)
+        return np.sqrt(np.maximum(self.total_variance(K, T), 0) / np.maximum(T, 1e-10))
+
+    def check_arbitrage(self, k=None, strikes=None):
+        """
+        Check every slice for butterfly arbitrage and every pair of adjacent slices for calendar arbitrage.
+
+        Calendar spreads compare adjacent slices at the same forward moneyness, at the test
+        points of both slices.
+
+        Parameters:
+        - k (array_like): Log-forward-moneyness points to test, shared by all slices (default:
+          201 points on [-1.5, 1.5])
+        - strikes (array_like): Strikes to test instead, at log(K / F(T)) for each slice
+
+        Returns:
+        - dict: 'butterfly' ({expiry: min g(k)}, negative means arbitrage), 'calendar'
+          ({(T1, T2): min w2(k) - w1(k)}, negative means arbitrage) and 'arbitrage_free'
+        """
+        if strikes is not None:
+            k = np.log(np.asarray(strikes, dtype=float)[None, :] / self.forward(self.expiries)[:, None])
+        else:
+            k = np.linspace(-1.5, 1.5, 201) if k is None else np.asarray(k, dtype=float)
+            k = np.broadcast_to(k, (self.expiries.size, k.size))
+        params = self.params.T[:, :, None]
+        g = svi_butterfly_density(k, *params)
+        butterfly = dict(zip(self.expiries.tolist(), g.min(axis=1).tolist()))
+        pairs = np.concatenate([k[:-1], k[1:]], axis=1)
+        gaps = svi_total_variance(pairs, *params[:, 1:]) - svi_total_variance(pairs, *params[:, :-1])
+        calendar = {
+            (float(T1), float(T2)): float(gap)
+            for T1, T2, gap in zip(self.expiries[:-1], self.expiries[1:], gaps.min(axis=1))
+        }
+        return {
+            'butterfly': butterfly,
+            'calendar': calendar,
+            'arbitrage_free': all(value >= 0 for value in (*butterfly.values(), *calendar.values())),
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+    from .advanced_models import sabr_implied_vol
+
+    S, r = 100.0, 0.03
+    expiries = np.array([0.1, 0.25, 0.5, 1.0, 2.0])
+    strikes = np.linspace(60, 140, 17)
+    K, T = np.meshgrid(strikes, expiries)
+    vols = sabr_implied_vol(S * np.exp(r * T), K, T, 2.0, 0.5, -0.4, 0.8)
+
+    start = time.perf_counter()
+    surface = VolatilitySurface.from_quotes(S, r, K.ravel(), T.ravel(), vols.ravel())
+    print(f"Fitted {expiries.size} SVI slices in {(time.perf_counter() - start) * 1e3:.1f} ms, "
+          f"max vol error {np.abs(surface.implied_vol(K, T) - vols).max():.2e}")
+
+    rng = np.random.default_rng(0)
+    queries = 1_000_000
+    query_K, query_T = rng.uniform(60, 140, queries), rng.uniform(0.05, 3.0, queries)
+    start = time.perf_counter()
+    surface.implied_vol(query_K, query_T)
+    print(f"{queries:,} lookups in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    start = time.perf_counter()
+    surface.update_slice(0.5, strikes, vols[2] * 1.02)
+    print(f"Refitted one slice in {(time.perf_counter() - start) * 1e3:.1f} ms")
+    # Check over the quoted moneyness range; raw SVI wings can break far outside it
+    print(f"Arbitrage free: {surface.check_arbitrage(strikes=strikes)['arbitrage_free']}")
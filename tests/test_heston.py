@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from src.utils.advanced_models import heston_analytic, heston_model
+
+HESTON_PARAMS = dict(v0=0.04, kappa=2.0, theta=0.04, sigma=0.3, rho=-0.7)
+
+
+@pytest.mark.parametrize("option_type", ['call', 'put'])
+@pytest.mark.parametrize("T", [0.25, 1.0])
+@pytest.mark.parametrize("K", [80.0, 100.0, 120.0])
+def test_analytic_within_mc_confidence_interval(K, T, option_type):
+    analytic = heston_analytic(100.0, K, T, 0.03, option_type=option_type, **HESTON_PARAMS)
+    price, stderr = heston_model(100.0, K, T, 0.03, option_type=option_type, n_simulations=50_000,
+                                 scheme='qe', rng=7, **HESTON_PARAMS)
+    assert abs(analytic - price) < 3 * stderr
+
+
+def test_short_maturity_is_not_truncated():
+    # With a fixed integration cutoff the quadrature leaked value into far out-of-the-money strikes
+    prices = heston_analytic(100.0, np.array([100.0, 130.0]), 0.002, 0.03, **HESTON_PARAMS)
+    reference = heston_analytic(100.0, np.array([100.0, 130.0]), 0.002, 0.03, n_points=4096, u_max=20_000,
+                                **HESTON_PARAMS)
+    assert prices[1] < 1e-8
+    np.testing.assert_allclose(prices, reference, atol=1e-7)
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.historical_data import CSVSource, HistoricalDataStore
+
+
+class RecordingSource(CSVSource):
+    """
+    CSV stand-in that logs every fetch, optionally starting overlap days early and shifting Close.
+    """
+
+    def __init__(self, overlap=0, shift=0.0):
+        super().__init__()
+        self.overlap = overlap
+        self.shift = shift
+        self.calls = []
+
+    def fetch(self, ticker, start, end):
+        self.calls.append((np.datetime64(start, 'D'), np.datetime64(end, 'D')))
+        bars = super().fetch(ticker, np.datetime64(start, 'D') - self.overlap, end).copy()
+        bars['Close'] += self.shift
+        return bars
+
+
+def test_refresh_fetches_only_missing_ranges(tmp_path):
+    source = RecordingSource()
+    store = HistoricalDataStore(tmp_path, source)
+    store.get("AAPL", "2022-03-01", "2022-06-01")
+    bars = store.get("AAPL", "2022-01-01", "2022-09-01")
+
+    assert source.calls[1:] == [(np.datetime64('2022-01-01'), np.datetime64('2022-03-01')),
+                                (np.datetime64('2022-06-01'), np.datetime64('2022-09-01'))]
+    expected = CSVSource().fetch("AAPL", "2022-01-01", "2022-09-01")
+    np.testing.assert_array_equal(bars.index.values, expected.index.values)
+    np.testing.assert_allclose(bars['Close'], expected['Close'])
+
+
+def test_coverage_stops_at_last_bar_and_empty_ranges_are_retried(tmp_path):
+    source = RecordingSource()
+    store = HistoricalDataStore(tmp_path, source)
+    # The sample data ends on 2022-12-30
+    store.refresh("AAPL", "2022-12-01", "2023-06-01")
+    assert store.coverage("AAPL") == (np.datetime64('2022-12-01'), np.datetime64('2022-12-31'))
+
+    assert store.refresh("AAPL", "2022-12-01", "2023-06-01") == 0
+    assert source.calls[-1] == (np.datetime64('2022-12-31'), np.datetime64('2023-06-01'))
+    assert store.coverage("AAPL") == (np.datetime64('2022-12-01'), np.datetime64('2022-12-31'))
+
+
+def test_refetched_bars_replace_stored_ones(tmp_path):
+    store = HistoricalDataStore(tmp_path, RecordingSource())
+    store.refresh("AAPL", "2022-01-01", "2022-06-01")
+    stored = store.get("AAPL", "2022-05-20", "2022-06-01", refresh=False)
+
+    # The second source also returns the last week of May, with revised closes
+    store.source = RecordingSource(overlap=7, shift=1.0)
+    assert store.refresh("AAPL", "2022-01-01", "2022-07-01") == len(
+        CSVSource().fetch("AAPL", "2022-06-01", "2022-07-01"))
+    revised = store.get("AAPL", "2022-05-20", "2022-06-01", refresh=False)
+
+    overlap = revised.index >= pd.Timestamp("2022-05-25")
+    np.testing.assert_array_equal(revised.index.values, stored.index.values)
+    np.testing.assert_allclose(revised['Close'][overlap], stored['Close'][overlap] + 1.0)
+    np.testing.assert_allclose(revised['Close'][~overlap], stored['Close'][~overlap])